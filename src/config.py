@@ -31,6 +31,11 @@ DEFAULT = {
         'mission_report_path': '',
         'mission_report_delete': True,
         'mission_report_backup_days': 31,
+        'mission_report_parser': 'tokenizer',
+        'mission_report_workers': 0,
+        'mission_report_cache': False,
+        'mission_report_incremental': False,
+        'log_entries_batch_size': 1000,
         'inactive_player_days': 7,
         'new_tour_by_month': True,
         'win_by_score': True,
@@ -98,6 +103,11 @@ MISSION_REPORT_PATH = Path(conf['game_server']['path'], 'data').joinpath(conf['s
 MISSION_REPORT_DELETE = conf['stats'].getboolean('mission_report_delete')
 MISSION_REPORT_BACKUP_DAYS = conf['stats'].getint('mission_report_backup_days')
 MISSION_REPORT_BACKUP_PATH = MISSION_REPORT_PATH.joinpath('mission_report_backup')
+MISSION_REPORT_PARSER = conf['stats']['mission_report_parser']
+MISSION_REPORT_WORKERS = conf['stats'].getint('mission_report_workers')
+MISSION_REPORT_CACHE = conf['stats'].getboolean('mission_report_cache')
+MISSION_REPORT_INCREMENTAL = conf['stats'].getboolean('mission_report_incremental')
+LOG_ENTRIES_BATCH_SIZE = conf['stats'].getint('log_entries_batch_size')
 
 INACTIVE_PLAYER_DAYS = conf['stats'].getint('inactive_player_days')
 NEW_TOUR_BY_MONTH = conf['stats'].getboolean('new_tour_by_month')
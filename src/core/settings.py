@@ -330,6 +330,16 @@ MISSION_REPORT_PATH = pathlib.Path('c:/il2/data/logs/txt/')
 MISSION_REPORT_DELETE = True
 MISSION_REPORT_BACKUP_DAYS = 7
 MISSION_REPORT_BACKUP_PATH = MISSION_REPORT_PATH.joinpath('mission_report_backup')
+# tokenizer | regex
+MISSION_REPORT_PARSER = 'tokenizer'
+# 0 - parse log files in the main process
+MISSION_REPORT_WORKERS = 0
+# binary cache of parsed events next to the log backup
+MISSION_REPORT_CACHE = False
+# process log files of the current mission as they appear, state is saved to a checkpoint
+MISSION_REPORT_INCREMENTAL = False
+# mission log entries are inserted into the DB in batches of this size
+LOG_ENTRIES_BATCH_SIZE = 1000
 
 # 0 - disable
 INACTIVE_PLAYER_DAYS = 7
@@ -0,0 +1,260 @@
+""" замер скорости разбора и обработки логов миссии (строк/сек) и пикового потребления памяти (RSS)
+
+запуск из каталога src:
+python -m mission_report.benchmark [--lines 2000000] [--path каталог_с_логами | --generate] [--keep]
+    [--modes режим ...] [--output benchmark.tsv]
+
+без --path и --generate разбираются синтетические строки SAMPLE_LINES,
+с --generate лог миссии создается генератором (mission_report.generator) во временном каталоге,
+для логов миссии кроме разбора замеряется MissionReport.processing (режим report)
+
+каждый режим запускается в отдельном процессе, чтобы пиковый RSS не зависел от предыдущих замеров,
+с --output результаты дописываются в файл (tsv) для отслеживания изменений производительности
+
+пиковая память обработки миссии со 100 тыс. объектов:
+python -m mission_report.benchmark --generate --objects 100000 --duration 1800 --modes report
+
+с --profile для режима report выводятся количество вызовов и время обработчиков и хуков событий
+
+проверка регрессии скорости разбора (токенайзер быстрее regex парсера), код возврата 1 при регрессии:
+python -m mission_report.benchmark --check
+"""
+import argparse
+from datetime import datetime
+import logging
+from itertools import cycle, islice
+import pathlib
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+from mission_report import generator, parse_mission_log_line
+from mission_report.report import MissionReport
+
+
+BASE_DIR = pathlib.Path(__file__).resolve().parents[1]
+
+
+# типичная смесь строк лога - позиции и повреждения составляют большую часть
+SAMPLE_LINES = (
+    'T:{tik} AType:17 ID:107519 POS(39013.016,45.535,16807.107)\n',
+    'T:{tik} AType:17 ID:107520 POS(39113.016,45.535,16907.107)\n',
+    'T:{tik} AType:17 ID:107521 POS(39213.016,45.535,17007.107)\n',
+    'T:{tik} AType:2 DMG:0.007 AID:172089 TID:133194 POS(23876.303,119.281,28392.604)\n',
+    'T:{tik} AType:2 DMG:0.012 AID:172089 TID:133194 POS(23876.303,119.281,28392.604)\n',
+    'T:{tik} AType:1 AMMO:BULLET_GER_792x57_SS AID:138247 TID:59392\n',
+    'T:{tik} AType:3 AID:107527 TID:106497 POS(25131.697,744.438,23284.689)\n',
+    'T:{tik} AType:12 ID:61440 TYPE:bridge_big_1[265,1] COUNTRY:201 NAME:Bridge PID:-1\n',
+    'T:{tik} AType:10 PLID:276479 PID:277503 BUL:2000 SH:0 BOMB:0 RCT:0 (133119.406,998.935,185101.141) '
+    'IDS:6f3b5e69-38d7-4d83-868c-4e7b8129f41a LOGIN:60dc67e3-ffb2-4df3-a6e5-579e945b4018 NAME:=FB=Vaal '
+    'TYPE:Il-2 mod.1942 COUNTRY:101 FORM:0 FIELD:0 INAIR:0 PARENT:-1 ISPL:1 ISTSTART:1 PAYLOAD:0 FUEL:1.000 SKIN: WM:1\n',
+    'T:{tik} AType:5 PID:109572 POS(23800.740, 116.003, 28128.986)\n',
+    'T:{tik} AType:6 PID:109572 POS(23800.740, 116.003, 28128.986)\n',
+    'T:{tik} AType:4 PLID:106497 PID:107521 BUL:869 SH:0 BOMB:0 RCT:0 (25727.014,57.894,23335.092)\n',
+    'T:{tik} AType:16 BOTID:108551 POS(23899.598,154.684,20580.168)\n',
+    'T:{tik} AType:22 PID:1684580 POS(223718.406, 10.337, 242309.250)\n',
+)
+
+# режимы: результат разбора (словарь или запись события) и парсер
+MODES = {
+    'dict-regex': parse_mission_log_line.parsers['regex'],
+    'dict-tokenizer': parse_mission_log_line.parsers['tokenizer'],
+    'record-regex': parse_mission_log_line.events_parsers['regex'],
+    'record-tokenizer': parse_mission_log_line.events_parsers['tokenizer'],
+    # разбор только используемых отчетом полей событий
+    'record-tokenizer-skip': parse_mission_log_line.get_events_parser('tokenizer', MissionReport.events_fields),
+    # повторяющиеся значения через таблицу символов (сравнивать пиковый RSS с --keep)
+    'record-tokenizer-interned': parse_mission_log_line.get_events_parser('tokenizer', symbols={}),
+}
+
+
+def synthetic_lines(total):
+    """
+    :type total: int
+    """
+    for tik, tpl in enumerate(islice(cycle(SAMPLE_LINES), total)):
+        yield tpl.format(tik=tik)
+
+
+def log_files(path):
+    """ файлы лога миссии по порядку
+
+    :type path: pathlib.Path
+    :rtype: list[pathlib.Path]
+    """
+    return sorted(path.glob('missionReport*.txt'), key=lambda x: int(x.stem.split('[')[1][:-1]))
+
+
+def log_lines(path):
+    """
+    :type path: pathlib.Path
+    """
+    for file_path in log_files(path):
+        with file_path.open() as f:
+            for line in f:
+                if 'AType' in line:
+                    yield line
+
+
+def peak_rss():
+    """ пиковый RSS процесса в МБ, None если недоступно (windows)
+
+    :rtype: float | None
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # в linux значение в килобайтах, в macOS в байтах
+    return rss / 1024 / 1024 if sys.platform == 'darwin' else rss / 1024
+
+
+def run_report(path, profile=False):
+    """ обработка лога миссии целиком, строки лога пишутся в архив как в stats_whore
+
+    :type path: pathlib.Path
+    :type profile: bool
+    :rtype: (int, float)
+    """
+    files = log_files(path)
+    objects = generator.load_objects(base_dir=BASE_DIR)
+    backup_dir = tempfile.mkdtemp(prefix='mission_report_backup_')
+    try:
+        time_start = time.perf_counter()
+        m_report = MissionReport(objects=objects, backup_path=pathlib.Path(backup_dir).joinpath('backup.txt.xz'),
+                                 profile=profile)
+        m_report.processing(files=files)
+        seconds = time.perf_counter() - time_start
+    finally:
+        shutil.rmtree(backup_dir)
+    return sum(1 for _ in log_lines(path)), seconds
+
+
+def run(mode, lines, keep=False):
+    """
+    :type mode: str
+    :type keep: bool
+    :rtype: (int, float)
+    """
+    parse = MODES[mode]
+    events = []
+    total = 0
+    time_start = time.perf_counter()
+    for line in lines:
+        event = parse(line)
+        if keep:
+            events.append(event)
+        total += 1
+    return total, time.perf_counter() - time_start
+
+
+def parse_costs(number=200, repeat=5):
+    """ время разбора SAMPLE_LINES токенайзером и эталонным regex парсером (минимум из repeat замеров)
+
+    :type number: int
+    :type repeat: int
+    :rtype: dict[str, (float, float)]
+    """
+    lines = [line.format(tik=1) for line in SAMPLE_LINES]
+
+    def cost(parse):
+        return min(timeit.repeat(lambda: [parse(line) for line in lines], number=number, repeat=repeat))
+
+    return {name: (cost(parsers['tokenizer']), cost(parsers['regex']))
+            for name, parsers in (('dict', parse_mission_log_line.parsers),
+                                  ('record', parse_mission_log_line.events_parsers))}
+
+
+def check_parse_cost():
+    """ сравнение времени разбора SAMPLE_LINES токенайзером и эталонным regex парсером
+
+    :return: True если токенайзер быстрее для словарей и записей событий
+    :rtype: bool
+    """
+    result = True
+    for name, (tokenizer, regex) in sorted(parse_costs().items()):
+        print('{name:<8} tokenizer {tokenizer:.4f} sec   regex {regex:.4f} sec'.format(
+            name=name, tokenizer=tokenizer, regex=regex))
+        result = result and tokenizer < regex
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='mission log parsing benchmark')
+    parser.add_argument('--lines', type=int, default=2000000, help='number of synthetic lines')
+    parser.add_argument('--path', help='directory with missionReport*.txt files instead of synthetic lines')
+    parser.add_argument('--generate', action='store_true', help='generate a mission log instead of synthetic lines')
+    parser.add_argument('--players', type=int, default=50, help='generated mission: number of players')
+    parser.add_argument('--duration', type=int, default=7200, help='generated mission: duration in seconds')
+    parser.add_argument('--objects', type=int, default=500, help='generated mission: number of ground objects')
+    parser.add_argument('--keep', action='store_true', help='keep all parsed events in memory')
+    parser.add_argument('--mode', choices=sorted(MODES) + ['report'], help='run a single mode in the current process')
+    parser.add_argument('--modes', nargs='+', choices=sorted(MODES) + ['report'], help='run only these modes')
+    parser.add_argument('--output', help='append results to a tab separated file')
+    parser.add_argument('--source', help='log label in the output file')
+    parser.add_argument('--profile', action='store_true', help='report mode: print event handlers call stats')
+    parser.add_argument('--check', action='store_true', help='fail if the tokenizer is not faster than regex parser')
+    args = parser.parse_args(argv)
+
+    if args.check:
+        if not check_parse_cost():
+            sys.exit(1)
+        return
+
+    if args.mode:
+        if args.mode == 'report':
+            if args.profile:
+                logging.basicConfig(level=logging.INFO, format='%(message)s')
+            total, seconds = run_report(path=pathlib.Path(args.path), profile=args.profile)
+        else:
+            lines = log_lines(pathlib.Path(args.path)) if args.path else synthetic_lines(args.lines)
+            total, seconds = run(mode=args.mode, lines=lines, keep=args.keep)
+        rss = peak_rss()
+        print('{mode:<25} {total:>10} lines {speed:>12,.0f} lines/sec   peak RSS {rss}'.format(
+            mode=args.mode, total=total, speed=total / seconds,
+            rss='{:.1f} MB'.format(rss) if rss is not None else 'n/a'))
+        if args.output:
+            with open(args.output, 'a') as f:
+                f.write('\t'.join(map(str, (datetime.now().strftime('%Y-%m-%d %H:%M:%S'), args.mode,
+                                            args.source or args.path or 'synthetic', total, round(total / seconds),
+                                            '' if rss is None else round(rss, 1)))) + '\n')
+        return
+
+    path, source, tmp_dir = args.path, args.source, None
+    if args.generate and not path:
+        source = source or 'generated:{}x{}x{}'.format(args.players, args.duration, args.objects)
+        tmp_dir = tempfile.mkdtemp(prefix='mission_report_benchmark_')
+        lines = generator.generate(players=args.players, duration=args.duration, objects=args.objects)
+        generator.write_chunks(path=pathlib.Path(tmp_dir), lines=lines)
+        path = tmp_dir
+    try:
+        modes = sorted(MODES)
+        # обработка отчета только для логов миссии
+        if path:
+            modes.append('report')
+        if args.modes:
+            modes = [mode for mode in modes if mode in args.modes]
+        for mode in modes:
+            cmd = [sys.executable, '-m', 'mission_report.benchmark', '--mode', mode, '--lines', str(args.lines)]
+            if path:
+                cmd += ['--path', path]
+            if args.keep:
+                cmd.append('--keep')
+            if args.profile:
+                cmd.append('--profile')
+            if args.output:
+                cmd += ['--output', args.output]
+            if source:
+                cmd += ['--source', source]
+            subprocess.check_call(cmd)
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+""" бинарный кэш разобранных событий миссии
+
+файл кэша: заголовок (метка, версия формата, подпись разбора) и блоки событий по файлам лога,
+каждый блок - длина и pickle списка (ID события, значения полей)
+"""
+import pickle
+import struct
+import zlib
+
+from mission_report.events import events_types
+from mission_report.parse_mission_log_line import atype_templates
+
+
+CACHE_MAGIC = b'IL2EVC'
+# менять при изменении формата файла кэша
+CACHE_VERSION = 1
+
+cache_header = struct.Struct('<6sHI')
+chunk_header = struct.Struct('<I')
+
+
+def cache_signature(fields=None):
+    """ подпись разбора событий - кэш записанный с другими шаблонами строк, полями записей
+    или пропускаемыми полями событий считается устаревшим
+
+    :type fields: dict[int, tuple] | None
+    :rtype: int
+    """
+    signature = (atype_templates, [event_type._fields for event_type in events_types], sorted((fields or {}).items()))
+    return zlib.crc32(repr(signature).encode('utf-8'))
+
+
+class EventsCacheWriter:
+    """ запись кэша, файл появляется только после успешной записи всех блоков """
+
+    def __init__(self, path, fields=None):
+        """
+        :type path: pathlib.Path
+        :type fields: dict[int, tuple] | None
+        """
+        self.path = path
+        self.tmp_path = path.with_name(path.name + '.tmp')
+        self.fields = fields
+        self.file = None
+
+    def __enter__(self):
+        if not self.path.parent.exists():
+            self.path.parent.mkdir(parents=True)
+        self.file = self.tmp_path.open('wb')
+        self.file.write(cache_header.pack(CACHE_MAGIC, CACHE_VERSION, cache_signature(fields=self.fields)))
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.file.close()
+        if exc_type is None:
+            self.tmp_path.replace(self.path)
+        else:
+            self.tmp_path.unlink()
+
+    def write(self, events):
+        """
+        :type events: collections.Iterable[tuple]
+        """
+        data = pickle.dumps([(event.atype_id, tuple(event)) for event in events], protocol=4)
+        self.file.write(chunk_header.pack(len(data)))
+        self.file.write(data)
+
+
+def read_cache(path, fields=None):
+    """ поток записей событий из кэша
+
+    :type path: pathlib.Path
+    :type fields: dict[int, tuple] | None
+    :rtype: collections.Iterable[tuple] | None
+    :return: None если кэша нет или он устарел
+    """
+    try:
+        f = path.open('rb')
+    except OSError:
+        return None
+    if f.read(cache_header.size) != cache_header.pack(CACHE_MAGIC, CACHE_VERSION, cache_signature(fields=fields)):
+        f.close()
+        return None
+    return iter_cache(f)
+
+
+def iter_cache(f):
+    """
+    :type f: io.BufferedReader
+    :rtype: collections.Iterable[tuple]
+    """
+    # записи создаются без вызова конструктора namedtuple
+    new = tuple.__new__
+    with f:
+        while True:
+            size = f.read(chunk_header.size)
+            if not size:
+                break
+            for atype_id, values in pickle.loads(f.read(chunk_header.unpack(size)[0])):
+                yield new(events_types[atype_id], values)
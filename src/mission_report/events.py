@@ -0,0 +1,54 @@
+from collections import namedtuple
+
+
+# параметры событий ссылающиеся на объекты миссии, в порядке их проверки
+OBJECTS_FIELDS = ('attacker_id', 'target_id', 'aircraft_id', 'bot_id', 'object_id')
+
+
+def event_type(name, atype_id, fields):
+    """ компактная запись события (namedtuple без __dict__) с порядком полей как в строке лога
+
+    :type name: str
+    :type atype_id: int
+    :type fields: str
+    """
+    base = namedtuple(name, fields)
+    return type(name, (base,), {
+        '__slots__': (),
+        'atype_id': atype_id,
+        'objects_fields': tuple(f for f in OBJECTS_FIELDS if f in base._fields),
+    })
+
+
+MissionStart = event_type('MissionStart', 0, 'tik date file_path game_type_id countries settings mods preset_id')
+Hit = event_type('Hit', 1, 'tik ammo attacker_id target_id')
+Damage = event_type('Damage', 2, 'tik damage attacker_id target_id pos')
+Kill = event_type('Kill', 3, 'tik attacker_id target_id pos')
+SortieEnd = event_type('SortieEnd', 4, 'tik aircraft_id bot_id cartridges shells bombs rockets pos')
+Takeoff = event_type('Takeoff', 5, 'tik aircraft_id pos')
+Landing = event_type('Landing', 6, 'tik aircraft_id pos')
+MissionEnd = event_type('MissionEnd', 7, 'tik')
+MissionResult = event_type('MissionResult', 8, 'tik object_id pos coal_id task_type_id success icon_type_id')
+AirfieldInfo = event_type('AirfieldInfo', 9, 'tik airfield_id country_id pos aircraft_id_list')
+PlayerSpawn = event_type('PlayerSpawn', 10, 'tik aircraft_id bot_id cartridges shells bombs rockets pos profile_id '
+                                            'account_id name aircraft_name country_id form airfield_id airstart '
+                                            'parent_id is_player is_tracking_stat payload_id fuel skin weapon_mods_id')
+Group = event_type('Group', 11, 'tik group_id members_id leader_id')
+GameObject = event_type('GameObject', 12, 'tik object_id object_name country_id name parent_id')
+InfluenceArea = event_type('InfluenceArea', 13, 'tik area_id country_id enabled in_air')
+InfluenceAreaBoundary = event_type('InfluenceAreaBoundary', 14, 'tik area_id boundary')
+LogVersion = event_type('LogVersion', 15, 'tik version')
+BotDeinitialization = event_type('BotDeinitialization', 16, 'tik bot_id pos')
+PosChanged = event_type('PosChanged', 17, 'tik object_id pos')
+BotEjectLeave = event_type('BotEjectLeave', 18, 'tik bot_id parent_id pos')
+RoundEnd = event_type('RoundEnd', 19, 'tik')
+PlayerConnected = event_type('PlayerConnected', 20, 'tik account_id profile_id')
+PlayerDisconnected = event_type('PlayerDisconnected', 21, 'tik account_id profile_id')
+TankTravel = event_type('TankTravel', 22, 'tik tank_id pos')
+
+# порядок важен т.к. позиция в tuple соответствует ID события
+events_types = (
+    MissionStart, Hit, Damage, Kill, SortieEnd, Takeoff, Landing, MissionEnd, MissionResult, AirfieldInfo, PlayerSpawn,
+    Group, GameObject, InfluenceArea, InfluenceAreaBoundary, LogVersion, BotDeinitialization, PosChanged, BotEjectLeave,
+    RoundEnd, PlayerConnected, PlayerDisconnected, TankTravel,
+)
@@ -0,0 +1,297 @@
+""" генератор синтетических логов миссии для тестов и замеров производительности
+
+запуск из каталога src:
+python -m mission_report.generator каталог [--players 20] [--duration 3600] [--objects 100] [--seed 0]
+
+создает набор файлов missionReport(...)[N].txt со всеми типами событий (AType 0-22):
+игроки подключаются, взлетают, стреляют по самолетам противника и наземным объектам, сбивают, прыгают,
+садятся на свой или чужой аэродром, завершают вылеты и отключаются,
+доли частых событий задаются весами mix (--mix 17:2 2:0.5 - вдвое больше позиций, вдвое меньше атак)
+"""
+import argparse
+import csv
+import pathlib
+import random
+
+
+# самолеты и аэродромы коалиций
+AIRCRAFT = {1: ('La-5 ser.8', 101), 2: ('Bf 109 F-4', 201)}
+AMMO = {1: 'BULLET_RUS_7-62x54_AP', 2: 'BULLET_GER_7-92x57_AP'}
+AIRFIELDS = {1: (20000.0, 50.0, 20000.0), 2: (80000.0, 50.0, 80000.0)}
+GROUND_OBJECTS = ('GAZ-M', 'Horch 830', '_T-34-76 STZ', '_PzKpfw III Ausf.L', 'static_A20B[-1,-1]')
+# территории коалиций - левая и правая половины карты 100x100 км
+AREAS = {
+    1: ((0.0, 74.3, 0.0), (50000.0, 74.3, 0.0), (50000.0, 74.3, 100000.0), (0.0, 74.3, 100000.0)),
+    2: ((50000.0, 74.3, 0.0), (100000.0, 74.3, 0.0), (100000.0, 74.3, 100000.0), (50000.0, 74.3, 100000.0)),
+}
+# тиков в секунде
+TIKS = 50
+# веса частоты событий относительно базовой: 1 - попаданий в атаке, 2 - атак (повреждения и уничтожения),
+# 10 - новых вылетов, 17 - позиций, 22 - движения танков, остальные события следуют из жизненного цикла вылета
+DEFAULT_MIX = {1: 1.0, 2: 1.0, 10: 1.0, 17: 1.0, 22: 1.0}
+
+
+def format_pos(pos):
+    """
+    :type pos: (float, float, float)
+    :rtype: str
+    """
+    return '{:.3f},{:.3f},{:.3f}'.format(*pos)
+
+
+def generate(players=20, duration=3600, objects=100, pos_every=5, attack_rate=0.03, mix=None, seed=0):
+    """ строки лога миссии в порядке тиков
+
+    :param players: количество игроков
+    :param duration: длительность миссии в секундах
+    :param objects: количество наземных объектов
+    :param pos_every: период событий позиции (AType 17) летящих самолетов в секундах
+    :param attack_rate: вероятность атаки летящим самолетом в секунду (AType 1, 2, 3)
+    :param mix: веса частоты событий по AType (DEFAULT_MIX), 0 - событий нет
+    :type mix: dict[int, float] | None
+    :type seed: int
+    :rtype: list[str]
+    """
+    weights = dict(DEFAULT_MIX)
+    weights.update(mix or {})
+    if set(weights) != set(DEFAULT_MIX):
+        raise ValueError('mix: unsupported AType {}'.format(sorted(set(weights) - set(DEFAULT_MIX))))
+    pos_period = scaled_period(pos_every, weights[17])
+    # танки двигаются раз в 10 минут, но не реже 4 раз за миссию
+    tank_period = scaled_period(min(600, max(duration // 4, 1)), weights[22])
+    # новые вылеты не начинаются в последнюю пятую часть миссии, длительность вылета - от 1/12 до 1/2 миссии
+    # (5 - 30 минут для часовой миссии)
+    spawn_until = duration * 4 // 5
+    sortie_time = (max(duration // 12, 10), max(duration // 2, 20))
+    rnd = random.Random(seed)
+    ids = iter(range(100000, 10 ** 9, 1024))
+    lines = []
+
+    def emit(tik, event):
+        lines.append('T:{} AType:{}\n'.format(tik, event))
+
+    emit(0, '0 GDate:1942.9.19 GTime:14:0:0 MFile:Multiplayer/Dogfight\\result.msnbin MID: GType:2 '
+            'CNTRS:0:0,101:1,201:2 SETTS:000000000010000100000000110 MODS:0 PRESET:0 AQMID:0 ROUNDS: 1 POINTS: 15000')
+    emit(0, '15 VER:17')
+    for coal_id, pos in AIRFIELDS.items():
+        emit(10, '9 AID:{} COUNTRY:{} POS({:.3f}, {:.3f}, {:.3f}) IDS()'.format(next(ids), AIRCRAFT[coal_id][1], *pos))
+    for coal_id, boundary in AREAS.items():
+        area_id = next(ids)
+        emit(0, '13 AID:{} COUNTRY:{} ENABLED:1 BC(0,0,0,0,0,0,0,0)'.format(area_id, AIRCRAFT[coal_id][1]))
+        emit(1, '14 AID:{} BP({})'.format(area_id, ','.join('({:.1f},{:.1f},{:.1f})'.format(*p) for p in boundary)))
+
+    ground = []
+    for _ in range(objects):
+        coal_id = rnd.choice((1, 2))
+        object_id = next(ids)
+        x = rnd.uniform(5000, 45000) if coal_id == 1 else rnd.uniform(55000, 95000)
+        emit(20, '12 ID:{} TYPE:{} COUNTRY:{} NAME:Vehicle PID:-1'.format(
+            object_id, rnd.choice(GROUND_OBJECTS), AIRCRAFT[coal_id][1]))
+        ground.append({'id': object_id, 'coal_id': coal_id, 'pos': (x, 0.0, rnd.uniform(5000, 95000)), 'hp': 100.0})
+    if ground:
+        emit(21, '11 GID:{} IDS:{} LID:{}'.format(
+            next(ids), ','.join(str(g['id']) for g in ground[:5]), ground[0]['id']))
+
+    pilots = []
+    for i in range(players):
+        pilots.append({
+            'coal_id': 1 + i % 2,
+            'account_id': '{:08d}-0000-4000-8000-{:012d}'.format(i, i),
+            'profile_id': '{:08d}-1111-4000-8000-{:012d}'.format(i, i),
+            'name': 'Pilot_{}'.format(i),
+            'state': 'offline',
+            'connect': rnd.randint(1, max(duration // 10, 1)),
+            'sortie': None,
+        })
+    flying = {1: [], 2: []}
+
+    for second in range(1, duration):
+        tik = second * TIKS
+        for pilot in pilots:
+            t = tik + rnd.randint(0, TIKS - 1)
+            state, sortie = pilot['state'], pilot['sortie']
+            if state == 'offline':
+                if second == pilot['connect']:
+                    emit(t, '20 USERID:{account_id} USERNICKID:{profile_id}'.format(**pilot))
+                    pilot['state'] = 'idle'
+            elif state == 'idle':
+                if second < spawn_until and rnd.random() < 0.02 * weights[10]:
+                    aircraft_name, country_id = AIRCRAFT[pilot['coal_id']]
+                    aircraft_id, bot_id = next(ids), next(ids)
+                    pos = AIRFIELDS[pilot['coal_id']]
+                    emit(t, '12 ID:{} TYPE:{} COUNTRY:{} NAME:{} PID:-1'.format(
+                        aircraft_id, aircraft_name, country_id, aircraft_name))
+                    emit(t, '12 ID:{} TYPE:BotPilot COUNTRY:{} NAME:BotPilot PID:{}'.format(
+                        bot_id, country_id, aircraft_id))
+                    emit(t, '10 PLID:{} PID:{} BUL:1000 SH:100 BOMB:0 RCT:0 ({}) IDS:{} LOGIN:{} NAME:{} '
+                            'TYPE:{} COUNTRY:{} FORM:0 FIELD:0 INAIR:2 PARENT:-1 ISPL:1 ISTSTART:1 PAYLOAD:0 '
+                            'FUEL:1.000 SKIN: WM:1'.format(aircraft_id, bot_id, format_pos(pos), pilot['profile_id'],
+                                                           pilot['account_id'], pilot['name'], aircraft_name,
+                                                           country_id))
+                    pilot['sortie'] = {'aircraft_id': aircraft_id, 'bot_id': bot_id, 'pos': pos, 'hp': 100.0,
+                                       'end': second + rnd.randint(*sortie_time),
+                                       'takeoff': second + rnd.randint(20, 90)}
+                    pilot['state'] = 'parked'
+            elif state == 'parked':
+                if second >= sortie['takeoff']:
+                    sortie['pos'] = (sortie['pos'][0] + 500, 300.0, sortie['pos'][2] + 500)
+                    emit(t, '5 PID:{} POS({})'.format(sortie['aircraft_id'], format_pos(sortie['pos'])))
+                    pilot['state'] = 'flying'
+                    flying[pilot['coal_id']].append(pilot)
+            elif state == 'flying':
+                direction = 1 if pilot['coal_id'] == 1 else -1
+                x, y, z = sortie['pos']
+                sortie['pos'] = (min(max(x + direction * rnd.uniform(0, 80), 1000), 99000), rnd.uniform(200, 3000),
+                                 min(max(z + rnd.uniform(-80, 80), 1000), 99000))
+                if pos_period and second % pos_period == 0:
+                    emit(t, '17 ID:{} POS({})'.format(sortie['aircraft_id'], format_pos(sortie['pos'])))
+                    emit(t, '17 ID:{} POS({})'.format(sortie['bot_id'], format_pos(sortie['pos'])))
+                if rnd.random() < attack_rate * weights[2]:
+                    attack(emit=emit, rnd=rnd, t=t, pilot=pilot, enemies=flying[3 - pilot['coal_id']], ground=ground,
+                           hits=weights[1])
+                if second >= sortie['end']:
+                    finish_sortie(emit=emit, rnd=rnd, t=t, pilot=pilot)
+                    flying[pilot['coal_id']].remove(pilot)
+        if ground and tank_period and second % tank_period == 0:
+            emit(tik, '22 PID:{} POS({})'.format(ground[0]['id'], format_pos(ground[0]['pos'])))
+
+    end = duration * TIKS
+    emit(end, '8 OBJID:102 POS(37286.734,0.000,18839.822) COAL:1 TYPE:0 RES:1 ICTYPE:0')
+    # незавершенные вылеты (на стоянке и в воздухе) завершаются до отключения игроков и конца миссии
+    for pilot in pilots:
+        if pilot['sortie']:
+            finish_sortie(emit=emit, rnd=rnd, t=end, pilot=pilot)
+    for pilot in pilots:
+        if pilot['state'] != 'offline':
+            emit(end + 4, '21 USERID:{account_id} USERNICKID:{profile_id}'.format(**pilot))
+    emit(end + 5, '19')
+    emit(end + 6, '7')
+    # события с задержкой (прыжок, добивание) могут оказаться раньше по тику чем следующие строки
+    lines.sort(key=lambda line: int(line[2:line.index(' ')]))
+    return lines
+
+
+def scaled_period(period, weight):
+    """ период событий с учетом веса из mix, None - события не генерируются
+
+    :type period: int
+    :type weight: float
+    :rtype: int | None
+    """
+    if weight <= 0:
+        return None
+    return max(1, int(round(period / weight)))
+
+
+def attack(emit, rnd, t, pilot, enemies, ground, hits=1.0):
+    """ атака самолета противника или наземного объекта: попадания (hits - вес их количества),
+    повреждение, возможно уничтожение """
+    sortie = pilot['sortie']
+    if enemies and rnd.random() < 0.6:
+        enemy = rnd.choice(enemies)
+        target, target_id = enemy['sortie'], enemy['sortie']['aircraft_id']
+    elif ground:
+        enemy = None
+        target = rnd.choice(ground)
+        target_id = target['id']
+        if target['hp'] <= 0:
+            return
+    else:
+        return
+    pos = format_pos(target['pos'])
+    for _ in range(int(round(rnd.randint(1, 4) * hits))):
+        emit(t, '1 AMMO:{} AID:{} TID:{}'.format(AMMO[pilot['coal_id']], sortie['aircraft_id'], target_id))
+    damage = rnd.uniform(0.05, 0.4)
+    emit(t, '2 DMG:{:.3f} AID:{} TID:{} POS({})'.format(damage, sortie['aircraft_id'], target_id, pos))
+    target['hp'] -= damage * 100
+    if target['hp'] > 0:
+        return
+    emit(t, '3 AID:{} TID:{} POS({})'.format(sortie['aircraft_id'], target_id, pos))
+    if enemy is not None:
+        enemy_sortie = enemy['sortie']
+        if rnd.random() < 0.5:
+            # пилот прыгнул
+            emit(t + 20, '18 BOTID:{} PARENTID:{} POS({})'.format(
+                enemy_sortie['bot_id'], enemy_sortie['aircraft_id'], pos))
+        else:
+            emit(t + 1, '2 DMG:1.000 AID:{} TID:{} POS({})'.format(sortie['aircraft_id'], enemy_sortie['bot_id'], pos))
+            emit(t + 1, '3 AID:{} TID:{} POS({})'.format(sortie['aircraft_id'], enemy_sortie['bot_id'], pos))
+        enemy_sortie['end'] = t // TIKS
+
+
+def finish_sortie(emit, rnd, t, pilot):
+    """ посадка (на свой аэродром или в поле) и завершение вылета, не взлетевший самолет не садится """
+    sortie = pilot['sortie']
+    if sortie['hp'] > 0 and pilot['state'] == 'flying':
+        if rnd.random() < 0.7:
+            x, y, z = AIRFIELDS[pilot['coal_id']]
+            pos = (x + rnd.uniform(-1500, 1500), y, z + rnd.uniform(-1500, 1500))
+        else:
+            pos = (rnd.uniform(2000, 98000), 10.0, rnd.uniform(2000, 98000))
+        emit(t, '6 PID:{} POS({})'.format(sortie['aircraft_id'], format_pos(pos)))
+        sortie['pos'] = pos
+    emit(t + 2, '4 PLID:{} PID:{} BUL:{} SH:{} BOMB:0 RCT:0 ({})'.format(
+        sortie['aircraft_id'], sortie['bot_id'], rnd.randint(0, 1000), rnd.randint(0, 100), format_pos(sortie['pos'])))
+    emit(t + 3, '16 BOTID:{} POS({})'.format(sortie['bot_id'], format_pos(sortie['pos'])))
+    pilot['state'] = 'idle'
+    pilot['sortie'] = None
+
+
+def write_chunks(path, lines, chunk=2000, name='missionReport(2020-01-01_12-00-00)'):
+    """ запись строк лога по файлам как это делает сервер
+
+    :type path: pathlib.Path
+    :type lines: list[str]
+    :param chunk: строк в файле
+    :rtype: list[pathlib.Path]
+    """
+    if not path.exists():
+        path.mkdir(parents=True)
+    files = []
+    for index, start in enumerate(range(0, len(lines), chunk)):
+        file_path = path.joinpath('{}[{}].txt'.format(name, index))
+        with file_path.open('w') as f:
+            f.writelines(lines[start:start + chunk])
+        files.append(file_path)
+    return files
+
+
+def load_objects(base_dir):
+    """ справочник объектов из csv файлов (как Object.objects.values() в stats_whore)
+
+    :type base_dir: pathlib.Path
+    :rtype: dict
+    """
+    with base_dir.joinpath('classes.csv').open(encoding='utf-8') as f:
+        classes = {row['cls']: row['cls_base'] for row in csv.DictReader(f)}
+    objects = {}
+    with base_dir.joinpath('objects.csv').open(encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            log_name = row['log_name'].lower()
+            objects[log_name] = {'log_name': log_name, 'cls': row['cls'], 'cls_base': classes.get(row['cls']),
+                                 'is_playable': bool(int(row['playable']))}
+    return objects
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='synthetic mission log generator')
+    parser.add_argument('path', help='output directory')
+    parser.add_argument('--players', type=int, default=20)
+    parser.add_argument('--duration', type=int, default=3600, help='mission duration in seconds')
+    parser.add_argument('--objects', type=int, default=100, help='number of ground objects')
+    parser.add_argument('--pos-every', type=int, default=5, help='AType 17 period of flying aircraft in seconds')
+    parser.add_argument('--attack-rate', type=float, default=0.03, help='attack probability per second')
+    parser.add_argument('--mix', nargs='+', default=[], metavar='ATYPE:WEIGHT',
+                        help='event frequency weights, e.g. 17:2 2:0.5 (AType 1, 2, 10, 17, 22)')
+    parser.add_argument('--chunk', type=int, default=2000, help='lines per file')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    mix = {int(atype_id): float(weight) for atype_id, weight in (item.split(':') for item in args.mix)}
+    lines = generate(players=args.players, duration=args.duration, objects=args.objects, pos_every=args.pos_every,
+                     attack_rate=args.attack_rate, mix=mix, seed=args.seed)
+    files = write_chunks(path=pathlib.Path(args.path), lines=lines, chunk=args.chunk)
+    print('{} lines in {} files'.format(len(lines), len(files)))
+
+
+if __name__ == '__main__':
+    main()
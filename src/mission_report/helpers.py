@@ -3,12 +3,15 @@ import math
 
 # http://www.ariel.com.au/a/python-point-int-poly.html
 def point_in_polygon(point, polygon):
+    """
+    :param polygon: вершины (x, z) или (x, y, z) как в логе (AType 14)
+    """
     x, y = point['x'], point['z']
     n = len(polygon)
     inside = False
-    p1x, p1y = polygon[0]
+    p1x, p1y = polygon[0][0], polygon[0][-1]
     for i in range(n + 1):
-        p2x, p2y = polygon[i % n]
+        p2x, p2y = polygon[i % n][0], polygon[i % n][-1]
         if min(p1y, p2y) < y <= max(p1y, p2y) and x <= max(p1x, p2x):
             if p1y != p2y:
                 xinters = (y - p1y) * (p2x - p1x) / (p2y - p1y) + p1x
@@ -0,0 +1,105 @@
+""" компактный буфер событий журнала миссии (респаун, взлет, посадка, повреждение, убийство и т.д.)
+
+события хранятся в типизированных массивах (array) вместо словаря на событие,
+объекты и вылеты событий - в общем списке, в массивах хранится их позиция в нем
+"""
+from array import array
+
+from mission_report.statuses import BotLifeStatus, LifeStatus
+
+
+# флаги событий
+FRIENDLY_FIRE = 1
+RTB = 2
+KILLED = 4
+
+NO_REF = -1
+NO_POS = float('nan')
+
+
+class LogEntries:
+    """ события в порядке добавления, итерация возвращает кортежи
+    (тип, тик, объект/вылет, цель, повреждение, флаги, позиция)
+
+    :type refs: list
+    """
+    types = ('respawn', 'end', 'takeoff', 'landed', 'bailout', 'damage', 'kill')
+    types_codes = {event_type: code for code, event_type in enumerate(types)}
+    # статус объекта (при посадке) хранится во флагах со сдвигом, 0 - нет статуса
+    statuses = (LifeStatus.unharmed, LifeStatus.damaged, LifeStatus.destroyed,
+                BotLifeStatus.healthy, BotLifeStatus.wounded, BotLifeStatus.dead)
+    status_shift = 3
+
+    def __init__(self):
+        self.type = array('B')
+        self.tik = array('q')
+        self.actor = array('q')
+        self.target = array('q')
+        self.damage = array('d')
+        self.flags = array('B')
+        self.x = array('d')
+        self.y = array('d')
+        self.z = array('d')
+        # объекты и вылеты событий и их позиции в списке по index
+        self.refs = []
+        self.refs_positions = {}
+
+    def __len__(self):
+        return len(self.type)
+
+    def __iter__(self):
+        types, refs = self.types, self.refs
+        for code, tik, actor, target, damage, flags, x, y, z in zip(
+                self.type, self.tik, self.actor, self.target, self.damage, self.flags, self.x, self.y, self.z):
+            yield (types[code], tik, None if actor == NO_REF else refs[actor],
+                   None if target == NO_REF else refs[target], damage, flags,
+                   # nan - позиции нет
+                   None if x != x else {'x': x, 'y': y, 'z': z})
+
+    def ref(self, obj):
+        """
+        :type obj: mission_report.report.Object | mission_report.report.Sortie | None
+        :rtype: int
+        """
+        if obj is None:
+            return NO_REF
+        position = self.refs_positions.get(obj.index)
+        if position is None:
+            position = self.refs_positions[obj.index] = len(self.refs)
+            self.refs.append(obj)
+        return position
+
+    def append(self, event_type, tik, actor=None, target=None, damage=0.0, flags=0, pos=None, status=None):
+        """
+        :type event_type: str
+        :type tik: int
+        :type damage: float
+        :type flags: int
+        :type pos: dict | None
+        :type status: str | None
+        """
+        if status is not None:
+            flags |= (self.statuses.index(status) + 1) << self.status_shift
+        self.type.append(self.types_codes[event_type])
+        self.tik.append(tik)
+        self.actor.append(self.ref(actor))
+        self.target.append(self.ref(target))
+        self.damage.append(damage)
+        self.flags.append(flags)
+        if pos:
+            self.x.append(pos['x'])
+            self.y.append(pos['y'])
+            self.z.append(pos['z'])
+        else:
+            self.x.append(NO_POS)
+            self.y.append(NO_POS)
+            self.z.append(NO_POS)
+
+    @classmethod
+    def get_status(cls, flags):
+        """
+        :type flags: int
+        :rtype: str | None
+        """
+        code = flags >> cls.status_shift
+        return cls.statuses[code - 1] if code else None
@@ -6,6 +6,7 @@ import unicodedata
 import logging
 
 from .constants import GAME_CLASSES
+from .events import events_types
 
 class UnexpectedATypeWarning(Warning):
     pass
@@ -73,7 +74,7 @@ atype_10 = re.compile(r'^T:(?P<tik>\d+) AType:10 PLID:(?P<aircraft_id>\d+) PID:(
                       r'FIELD:(?P<airfield_id>\d+) INAIR:(?P<airstart>\d) PARENT:(?P<parent_id>[-\d]+) '
                       r'ISPL:(?P<is_player>\d+) ISTSTART:(?P<is_tracking_stat>\d+) '
                       r'PAYLOAD:(?P<payload_id>\d+) FUEL:(?P<fuel>\S{5,6}) '
-                      r'SKIN:(?P<skin>[\S ]*) WM:(?P<weapon_mods_id>\d+)')
+                      r'SKIN:(?P<skin>.*) WM:(?P<weapon_mods_id>\d+)')
 
 
 # группа объектов, с лидером и список членов
@@ -143,6 +144,42 @@ atype_handlers = [
 ]
 
 
+# шаблоны строк для токенайзера (парсер без регулярок)
+# <name> - значение параметра, <> - значение пропускается
+# значение параметра заканчивается там где начинается следующий за ним литерал шаблона,
+# значение последнего параметра - до конца строки (за вычетом литерала в конце шаблона) или до первого пробела
+atype_templates = (
+    'T:<tik> AType:0 GDate:<date> MFile:<file_path> MID:<> GType:<game_type_id> CNTRS:<countries> '
+    'SETTS:<settings> MODS:<mods> PRESET:<preset_id>',
+    'T:<tik> AType:1 AMMO:<ammo> AID:<attacker_id> TID:<target_id>',
+    'T:<tik> AType:2 DMG:<damage> AID:<attacker_id> TID:<target_id> POS(<pos>)',
+    'T:<tik> AType:3 AID:<attacker_id> TID:<target_id> POS(<pos>)',
+    'T:<tik> AType:4 PLID:<aircraft_id> PID:<bot_id> BUL:<cartridges> SH:<shells> BOMB:<bombs> RCT:<rockets> (<pos>)',
+    'T:<tik> AType:5 PID:<aircraft_id> POS(<pos>)',
+    'T:<tik> AType:6 PID:<aircraft_id> POS(<pos>)',
+    'T:<tik> AType:7',
+    'T:<tik> AType:8 OBJID:<object_id> POS(<pos>) COAL:<coal_id> TYPE:<task_type_id> RES:<success> '
+    'ICTYPE:<icon_type_id>',
+    'T:<tik> AType:9 AID:<airfield_id> COUNTRY:<country_id> POS(<pos>) IDS(<aircraft_id_list>)',
+    'T:<tik> AType:10 PLID:<aircraft_id> PID:<bot_id> BUL:<cartridges> SH:<shells> BOMB:<bombs> RCT:<rockets> '
+    '(<pos>) IDS:<profile_id> LOGIN:<account_id> NAME:<name> TYPE:<aircraft_name> COUNTRY:<country_id> FORM:<form> '
+    'FIELD:<airfield_id> INAIR:<airstart> PARENT:<parent_id> ISPL:<is_player> ISTSTART:<is_tracking_stat> '
+    'PAYLOAD:<payload_id> FUEL:<fuel> SKIN:<skin> WM:<weapon_mods_id>',
+    'T:<tik> AType:11 GID:<group_id> IDS:<members_id> LID:<leader_id>',
+    'T:<tik> AType:12 ID:<object_id> TYPE:<object_name> COUNTRY:<country_id> NAME:<name> PID:<parent_id>',
+    'T:<tik> AType:13 AID:<area_id> COUNTRY:<country_id> ENABLED:<enabled> BC(<in_air>)',
+    'T:<tik> AType:14 AID:<area_id> BP<boundary>',
+    'T:<tik> AType:15 VER:<version>',
+    'T:<tik> AType:16 BOTID:<bot_id> POS(<pos>)',
+    'T:<tik> AType:17 ID:<object_id> POS(<pos>)',
+    'T:<tik> AType:18 BOTID:<bot_id> PARENTID:<parent_id> POS(<pos>)',
+    'T:<tik> AType:19',
+    'T:<tik> AType:20 USERID:<account_id> USERNICKID:<profile_id>',
+    'T:<tik> AType:21 USERID:<account_id> USERNICKID:<profile_id>',
+    'T:<tik> AType:22 PID:<tank_id> POS(<pos>)',
+)
+
+
 re_pos = re.compile(r'[.\-\d]+,\s*[.\-\d]+,\s*[.\-\d]+')
 
 
@@ -172,6 +209,31 @@ def object_name_handler(type_):
         return type_
 
 
+try:
+    is_ascii = str.isascii
+except AttributeError:
+    # python < 3.7
+    def is_ascii(line):
+        """
+        :type line: str
+        :rtype: bool
+        """
+        try:
+            line.encode('ascii')
+        except UnicodeEncodeError:
+            return False
+        return True
+
+
+def text_handler(value):
+    """ текстовые параметры игрока (NAME:, SKIN:) - единственные в которых бывают не ASCII символы,
+    нормализуется только значение параметра, а не вся строка
+
+    :type value: str
+    """
+    return value if is_ascii(value) else unicodedata.normalize('NFKD', value)
+
+
 params_handlers = {
     'aircraft_id': int,
     'bombs': int,
@@ -213,6 +275,8 @@ params_handlers = {
     'settings': lambda s: tuple(map(int, s)),
     'success': lambda s: s == '1',
     'object_name': object_name_handler,
+    'name': text_handler,
+    'skin': text_handler,
     'weapon_mods_id': lambda s: [i for i, wm in enumerate(bin(int(s))[2:-1][::-1], start=1) if wm == '1'],
 }
 
@@ -222,7 +286,6 @@ def parse(line):
     :type line: str
     :rtype: dict | None
     """
-    line = unicodedata.normalize('NFKD', line)
     atype_id = int(line.partition('AType:')[2][:2])
     if 0 <= atype_id <= 22:
         data = atype_handlers[atype_id].match(line.strip()).groupdict()
@@ -233,3 +296,206 @@ def parse(line):
         return data
     else:
         raise UnexpectedATypeWarning
+
+
+def pos_tokens_handler(pos):
+    """ аналог pos_handler без регулярного выражения
+
+    :type pos: str
+    """
+    try:
+        x, y, z = map(float, pos.split(','))
+    except ValueError:
+        # баг логов - координаты вида -1.#QO
+        return None
+    if z == float('-inf') or z == float('inf'):
+        logging.info('z={}'.format(z))
+        z = 0
+    return {'x': x, 'y': y, 'z': z}
+
+
+def skip_handler(value):
+    """ обработчик значений не используемых при обработке параметров
+
+    :type value: str
+    """
+    return None
+
+
+tokens_handlers = dict(params_handlers)
+tokens_handlers['pos'] = pos_tokens_handler
+# тип объекта может содержать суффикс [-1,-1] который отбрасываем
+tokens_handlers['object_name'] = lambda s: object_name_handler(s.partition('[')[0])
+
+
+# параметры значения которых многократно повторяются в логе миссии,
+# при разборе с таблицей символов миссии хранятся в одном экземпляре
+interned_params = ('account_id', 'aircraft_name', 'ammo', 'name', 'object_name', 'profile_id', 'skin')
+
+
+def intern_handler(handler, symbols):
+    """ обработчик значения возвращающий экземпляр из таблицы символов
+
+    :type handler: function
+    :type symbols: dict
+    """
+    setdefault = symbols.setdefault
+    if handler is str:
+        return lambda value: setdefault(value, value)
+
+    def wrapper(value):
+        value = handler(value)
+        return setdefault(value, value)
+    return wrapper
+
+
+def compile_template(template, fields=None, handlers=tokens_handlers):
+    """ разбор шаблона строки на начальный литерал, токены (литерал окончания значения, обработчик),
+    обработчик последнего значения, литерал в конце строки и заполнение для не разобранных параметров
+
+    если задан fields - остальные параметры не разбираются, а разбор строки заканчивается
+    на последнем из используемых параметров (обработчик последнего значения None)
+
+    :type template: str
+    :type fields: tuple | None
+    :type handlers: dict
+    :rtype: (str, tuple, function | None, str, tuple)
+    """
+    parts = re.split(r'<(\w*)>', template)
+    literals, names = parts[0::2], parts[1::2]
+    tokens = []
+    # значение параметра names[i] заканчивается на литерале literals[i + 1]
+    # для пропускаемых значений обработчик None
+    for name, literal in zip(names, literals[1:]):
+        if not name:
+            handler = None
+        elif fields is None or name in fields:
+            handler = handlers.get(name, str)
+        else:
+            handler = skip_handler
+        tokens.append((literal, handler))
+    if fields is not None:
+        used = [i for i, (literal, handler) in enumerate(tokens) if handler not in (None, skip_handler)]
+        end = used[-1] + 1 if used else 0
+        if end < len(tokens):
+            padding = (None,) * len([name for name in names[end:] if name])
+            return literals[0], tuple(tokens[:end]), None, '', padding
+    return literals[0], tuple(tokens[:-1]), tokens[-1][1], literals[-1], ()
+
+
+def compile_tokens(fields=None, symbols=None):
+    """ таблица разбора строк по ID события
+
+    :param fields: используемые параметры по ID события, для не указанных событий разбираются все параметры
+    :type fields: dict[int, tuple] | None
+    :param symbols: таблица символов миссии для значений interned_params
+    :type symbols: dict | None
+    :rtype: list
+    """
+    fields = fields or {}
+    handlers = tokens_handlers
+    if symbols is not None:
+        handlers = dict(tokens_handlers)
+        for name in interned_params:
+            handlers[name] = intern_handler(handlers.get(name, str), symbols=symbols)
+    return [compile_template(template, fields.get(atype_id), handlers=handlers)
+            for atype_id, template in enumerate(atype_templates)]
+
+
+atype_tokens = compile_tokens()
+# имена параметров в порядке их следования в строке
+atype_params = [tuple(name for name in re.findall(r'<(\w*)>', template) if name) for template in atype_templates]
+
+
+def tokenize(line, table=atype_tokens):
+    """ однопроходный разбор строки лога на значения параметров
+
+    :type line: str
+    :type table: list
+    :rtype: (int, list)
+    """
+    atype_id = int(line.partition('AType:')[2][:2])
+    if not 0 <= atype_id <= 22:
+        raise UnexpectedATypeWarning
+    head, tokens, last_handler, tail, padding = table[atype_id]
+    if not line.startswith(head):
+        raise ValueError('bad line: {}'.format(line))
+    rest = line[len(head):]
+    values = []
+    for literal, handler in tokens:
+        value, sep, rest = rest.partition(literal)
+        if not sep:
+            raise ValueError('bad line: {}'.format(line))
+        if handler is not None:
+            values.append(handler(value))
+    # остаток строки не нужен
+    if last_handler is None:
+        values.extend(padding)
+        return atype_id, values
+    if tail:
+        if not rest.endswith(tail):
+            raise ValueError('bad line: {}'.format(line))
+        rest = rest[:-len(tail)]
+    else:
+        rest = rest.partition(' ')[0]
+    values.append(last_handler(rest))
+    return atype_id, values
+
+
+def parse_tokenized(line):
+    """ аналог parse без регулярных выражений
+
+    :type line: str
+    :rtype: dict | None
+    """
+    atype_id, values = tokenize(line.strip())
+    data = dict(zip(atype_params[atype_id], values))
+    data['atype_id'] = atype_id
+    return data
+
+
+def parse_event(line, table=atype_tokens):
+    """ разбор строки лога сразу в запись события, без промежуточного словаря
+
+    :type line: str
+    :type table: list
+    """
+    atype_id, values = tokenize(line.strip(), table=table)
+    return events_types[atype_id](*values)
+
+
+def parse_event_regex(line):
+    """
+    :type line: str
+    """
+    data = parse(line)
+    return events_types[data.pop('atype_id')](**data)
+
+
+# доступные парсеры строк лога
+parsers = {
+    'regex': parse,
+    'tokenizer': parse_tokenized,
+}
+
+# парсеры строк лога в записи событий
+events_parsers = {
+    'regex': parse_event_regex,
+    'tokenizer': parse_event,
+}
+
+
+def get_events_parser(parser, fields=None, symbols=None):
+    """ парсер строк лога в записи событий
+
+    tokenizer разбирает только используемые параметры событий из fields (не используемые равны None)
+    и хранит повторяющиеся значения в таблице символов symbols,
+    regex всегда разбирает строку полностью
+
+    :type parser: str
+    :type fields: dict[int, tuple] | None
+    :type symbols: dict | None
+    """
+    if parser == 'tokenizer' and (fields or symbols is not None):
+        return functools.partial(parse_event, table=compile_tokens(fields, symbols=symbols))
+    return events_parsers[parser]
@@ -1,16 +1,115 @@
-from collections import defaultdict
+from collections import Counter, defaultdict
 from itertools import count
 import logging
-import operator
+import lzma
+import multiprocessing
+import pickle
+import time
 
 from mission_report.constants import COALITION_ALIAS
 from mission_report.statuses import BotLifeStatus, SortieStatus, LifeStatus
-from mission_report.helpers import distance, point_in_polygon, is_pos_correct
+from mission_report.helpers import distance, is_pos_correct
+from mission_report.log_entries import FRIENDLY_FIRE, KILLED, RTB, LogEntries
 from mission_report import parse_mission_log_line
+from mission_report.cache import EventsCacheWriter, cache_signature, read_cache
+from mission_report.spatial import AirfieldsIndex, AreasIndex, Polygon
+from mission_report.stream import log_bad_line, read_events, reorder_events
 
 
 logger = logging.getLogger('mission_report')
 
+# менять при изменении состава состояния отчета
+CHECKPOINT_VERSION = 8
+# степень сжатия архива строк лога, с 6 (по умолчанию) сжатие в разы медленнее и требует ~100 МБ памяти
+BACKUP_PRESET = 2
+
+
+# парсер процесса пула
+worker_parse = None
+
+
+def init_worker(parser, fields):
+    """
+    :type parser: str
+    :type fields: dict[int, tuple]
+    """
+    global worker_parse
+    # своя таблица символов в каждом процессе пула
+    worker_parse = parse_mission_log_line.get_events_parser(parser, fields=fields, symbols={})
+
+
+def read_events_worker(file_path):
+    """
+    :type file_path: pathlib.Path
+    :rtype: list
+    """
+    return list(read_events(file_path=file_path, parse=worker_parse))
+
+
+class CheckpointPickler(pickle.Pickler):
+    """ объекты и вылеты ссылаются друг на друга (killboard, damagers, parent и т.д.), при обычном pickle
+    глубина рекурсии растет с размером миссии - вместо них пишутся ссылки, а их атрибуты отдельными блоками
+    """
+
+    def __init__(self, file):
+        super().__init__(file, protocol=4)
+        self.indexed = []
+        self.indexed_ids = {}
+
+    def persistent_id(self, obj):
+        if type(obj) not in checkpoint_types:
+            return None
+        pid = self.indexed_ids.get(id(obj))
+        if pid is None:
+            pid = self.indexed_ids[id(obj)] = (checkpoint_types.index(type(obj)), obj.index, len(self.indexed))
+            self.indexed.append(obj)
+        return pid
+
+    def dump_report(self, m_report):
+        """
+        :type m_report: MissionReport
+        """
+        self.dump(m_report)
+        # атрибуты объектов могут ссылаться на новые объекты - пишем пока они появляются
+        start = 0
+        while start < len(self.indexed):
+            end = len(self.indexed)
+            self.dump([[getattr(obj, name) for name in obj.__slots__] for obj in self.indexed[start:end]])
+            start = end
+        self.dump(None)
+
+
+class CheckpointUnpickler(pickle.Unpickler):
+    def __init__(self, file):
+        super().__init__(file)
+        self.indexed = []
+
+    def persistent_load(self, pid):
+        type_id, index, position = pid
+        if position == len(self.indexed):
+            obj = checkpoint_types[type_id].__new__(checkpoint_types[type_id])
+            # hash нужен до восстановления остальных атрибутов
+            obj.index = index
+            self.indexed.append(obj)
+        return self.indexed[position]
+
+    def load_report(self):
+        """
+        :rtype: MissionReport
+        """
+        m_report = self.load()
+        position = 0
+        while True:
+            states = self.load()
+            if states is None:
+                break
+            for state in states:
+                obj = self.indexed[position]
+                for name, value in zip(obj.__slots__, state):
+                    setattr(obj, name, value)
+                position += 1
+        return m_report
+
 
 class MissionReport:
     """
@@ -26,11 +125,81 @@ class MissionReport:
     :type lost_bots: dict[int, Sortie]
     """
 
-    def __init__(self, objects):
+    # поля событий используемые при обработке (по ID события), остальные поля парсер пропускает без разбора
+    # для событий которых здесь нет используются все поля
+    events_fields = {
+        11: ('tik',),
+        15: ('tik',),
+        # object_id нужен для обновления tik_last вылета
+        17: ('tik', 'object_id'),
+        19: ('tik',),
+        22: ('tik',),
+    }
+    # обработка событий по ID (позиция в tuple): обработчик, хуки до и после обработчика,
+    # обработчик получает поля записи позиционно, хуки - запись целиком
+    # update_last_pos - для событий с позицией и объектами, update_ratio - во время взлета, посадки, убийства,
+    # прыжка, завершения, update_last_tik - для событий с объектами
+    events_dispatch = (
+        ('event_mission_start', (), ()),
+        ('event_hit', (), ('update_last_tik',)),
+        ('event_damage', ('update_last_pos',), ('update_last_tik',)),
+        ('event_kill', ('update_last_pos', 'update_ratio'), ('update_last_tik',)),
+        ('event_sortie_end', ('update_last_pos', 'update_ratio'), ('update_last_tik',)),
+        ('event_takeoff', ('update_last_pos', 'update_ratio'), ('update_last_tik',)),
+        ('event_landing', ('update_last_pos', 'update_ratio'), ('update_last_tik',)),
+        ('event_mission_end', (), ()),
+        ('event_mission_result', ('update_last_pos',), ('update_last_tik',)),
+        ('event_airfield', (), ()),
+        ('event_player', ('update_last_pos',), ('update_last_tik',)),
+        ('event_group', (), ()),
+        ('event_game_object', (), ('update_last_tik',)),
+        ('event_influence_area', (), ()),
+        ('event_influence_area_boundary', (), ()),
+        ('event_log_version', (), ()),
+        ('event_bot_deinitialization', ('update_last_pos',), ('update_last_tik',)),
+        # позиция не разбирается (events_fields)
+        ('event_pos_changed', (), ('update_last_tik',)),
+        ('event_bot_eject_leave', ('update_last_pos', 'update_ratio'), ('update_last_tik',)),
+        ('event_round_end', (), ()),
+        ('event_player_connected', (), ()),
+        ('event_player_disconnected', (), ()),
+        ('event_tank_travel', (), ()),
+    )
+    # окно упорядочивания событий по tik и поиска дублей (событий)
+    reorder_window = 32
+    # события которые законно повторяются в одном tik (попадания и повреждения от очереди)
+    repeatable_atypes = frozenset((1, 2))
+
+    def __init__(self, objects, parser='tokenizer', workers=0, backup_path=None, profile=False):
         """
         :type objects: dict
+        :type parser: str
+        :param workers: количество процессов для разбора файлов лога, 0 или 1 - разбор в текущем процессе
+        :type workers: int
+        :param backup_path: архив (xz) для строк лога, без него строки собираются в self.lines
+        :type backup_path: pathlib.Path | None
+        :param profile: подсчет вызовов и времени обработчиков и хуков событий
+        :type profile: bool
         """
         self.index = count().__next__
+        self.parser = parser
+        self.backup_path = backup_path
+        # размер архива после последней обработки файлов
+        self.backup_size = 0
+        self.workers = workers
+        # таблица символов миссии - повторяющиеся значения событий хранятся в одном экземпляре
+        self.symbols = {}
+        self.parse = parse_mission_log_line.get_events_parser(parser, fields=self.events_fields, symbols=self.symbols)
+        self.profile = profile
+        # количество вызовов и время (сек) обработчиков и хуков событий по имени метода
+        self.handlers_calls = Counter()
+        self.handlers_time = Counter()
+        # счетчики строк разобранных не полностью, по ID события
+        self.skipped_lines = Counter()
+        # счетчики исправленных окном упорядочивания событий (дубли, опоздавшие события)
+        self.corrected_events = Counter()
+        # имена обработанных файлов лога
+        self.files_processed = []
 
         self.tik_last = 0
         self.countries = None
@@ -41,7 +210,10 @@ class MissionReport:
         self.preset_id = None
         self.settings = None
         self.areas = {}
+        # индекс включенных зон с границами, сбрасывается при изменении зон
+        self.areas_index = None
         self.airfields = {}
+        self.airfields_index = AirfieldsIndex(radius=Airfield.radius)
         self.objects = objects
         self.objects_id_map = {}
         self.sorties_aircraft = {}
@@ -50,93 +222,297 @@ class MissionReport:
         self.sorties = []
         self.is_correctly_completed = False
         self.active_sorties = defaultdict(set)
+        # количество активных вылетов всех коалиций
+        self.active_sorties_total = 0
         self.lines = []
         self.winning_coal_id = None
         self.winning_coal_type = None
         # self.online_uuid = set()
-        self.log_entries = []
+        self.log_entries = LogEntries()
 
         # словари вылетов для которых не нашлось объекта - поздняя инициализация
         self.lost_aircraft = {}
         self.lost_bots = {}
 
-        # порядок важен т.к. позиция в tuple соответствует ID события
-        self.events_handlers = (self.event_mission_start, self.event_hit, self.event_damage, self.event_kill,
-                                self.event_sortie_end, self.event_takeoff, self.event_landing, self.event_mission_end,
-                                self.event_mission_result, self.event_airfield, self.event_player, self.event_group,
-                                self.event_game_object, self.event_influence_area, self.event_influence_area_boundary,
-                                self.event_log_version, self.event_bot_deinitialization, self.event_pos_changed,
-                                self.event_bot_eject_leave, self.event_round_end, self.event_player_connected,
-                                self.event_player_disconnected, self.event_tank_travel)
+        self.events_handlers = self.get_events_handlers()
 
-    def processing(self, files):
-        """
-        :type files: list
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # объекты игры передаются при загрузке, парсер и обработчики создаются заново
+        for name in ('objects', 'parse', 'events_handlers'):
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.objects = None
+        self.parse = parse_mission_log_line.get_events_parser(
+            self.parser, fields=self.events_fields, symbols=self.symbols)
+        self.events_handlers = self.get_events_handlers()
+
+    def get_events_handlers(self):
+        """ методы events_dispatch: (обработчик, хуки до, хуки после) по ID события
+
+        :rtype: tuple
         """
-        # TODO добавить проверку на одинаковые записи подряд
-        # TODO можно либо собирать список всех записей, либо использовать очередь
-        # TODO https://docs.python.org/3/library/collections.html#deque-objects
-        # TODO и собирать только 5-10 последних
-        for file_path in files:
-            with file_path.open() as f:
-                for line in f:
-                    # игнорируем "плохие" строки без
-                    if 'AType' not in line:
-                        logger.warning('ignored bad string: [{}]'.format(line))
-                        continue
-                    self.lines.append(line)
+        get_method = self.get_profiled_method if self.profile else self.__getattribute__
+        return tuple((get_method(handler), tuple(get_method(hook) for hook in before),
+                      tuple(get_method(hook) for hook in after))
+                     for handler, before, after in self.events_dispatch)
+
+    def get_profiled_method(self, name):
+        """ метод с подсчетом количества вызовов и времени
 
-                    try:
-                        data = parse_mission_log_line.parse(line)
-                    except AttributeError:
-                        logger.error('bad line: [{}]'.format(line.strip()))
-                        continue
-                    except parse_mission_log_line.UnexpectedATypeWarning:
-                        logger.warning('unexpected atype: [{}]'.format(line))
-                        continue
+        :type name: str
+        :rtype: collections.Callable
+        """
+        method = getattr(self, name)
+        calls, times = self.handlers_calls, self.handlers_time
+
+        def profiled(*args):
+            time_start = time.perf_counter()
+            try:
+                return method(*args)
+            finally:
+                times[name] += time.perf_counter() - time_start
+                calls[name] += 1
+        return profiled
+
+    @classmethod
+    def load_checkpoint(cls, path, objects):
+        """ восстановление состояния отчета сохраненного save_checkpoint
+
+        :type path: pathlib.Path
+        :type objects: dict
+        :rtype: MissionReport | None
+        :return: None если сохраненного состояния нет или оно устарело
+        """
+        try:
+            f = path.open('rb')
+        except OSError:
+            return None
+        with f:
+            unpickler = CheckpointUnpickler(f)
+            try:
+                if unpickler.load() != (CHECKPOINT_VERSION, cache_signature(fields=cls.events_fields)):
+                    return None
+                m_report = unpickler.load_report()
+            except Exception as e:
+                logger.warning('checkpoint {path} - {error}'.format(path=path, error=e))
+                return None
+        m_report.objects = objects
+        return m_report
+
+    def save_checkpoint(self, path):
+        """ сохранение состояния отчета, файл заменяется только после успешной записи
+
+        :type path: pathlib.Path
+        """
+        if not path.parent.exists():
+            path.parent.mkdir(parents=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+        try:
+            with tmp_path.open('wb') as f:
+                pickler = CheckpointPickler(f)
+                pickler.dump((CHECKPOINT_VERSION, cache_signature(fields=self.events_fields)))
+                pickler.dump_report(self)
+        except BaseException:
+            tmp_path.unlink()
+            raise
+        tmp_path.replace(path)
+
+    def feed(self, files):
+        """ обработка файлов лога которые еще не обрабатывались, файлы должны быть дописаны до конца
 
-                    atype_id = data.pop('atype_id')
+        :type files: list
+        :rtype: int
+        :return: количество обработанных файлов
+        """
+        files = [file_path for file_path in files if file_path.name not in self.files_processed]
+        if files:
+            self.process_files(files=files)
+        return len(files)
 
-                    if data['tik'] > self.tik_last:
-                        self.tik_last = data['tik']
+    def processing(self, files, cache_path=None):
+        """
+        :type files: list
+        :param cache_path: файл для записи кэша разобранных событий
+        :type cache_path: pathlib.Path | None
+        """
+        self.process_files(files=files, cache_path=cache_path)
+        self.log_stats()
 
-                    if 'country_id' in data:
-                        data['coal_id'] = self.countries[data['country_id']]
+    def process_files(self, files, cache_path=None):
+        """
+        :type files: list
+        :type cache_path: pathlib.Path | None
+        """
+        backup = self.open_backup() if self.backup_path else None
+        try:
+            if self.workers > 1 and len(files) > 1:
+                # разбор файлов в процессах пула, применение событий в порядке файлов
+                with multiprocessing.Pool(processes=min(self.workers, len(files)), initializer=init_worker,
+                                          initargs=(self.parser, self.events_fields)) as pool:
+                    self.apply_files_events(files_events=pool.imap(read_events_worker, files),
+                                            cache_path=cache_path, backup=backup)
+            else:
+                files_events = (read_events(file_path=file_path, parse=self.parse) for file_path in files)
+                self.apply_files_events(files_events=files_events, cache_path=cache_path, backup=backup)
+        finally:
+            if backup:
+                backup.close()
+                self.backup_size = self.backup_path.stat().st_size
+        self.files_processed.extend(file_path.name for file_path in files)
+
+    def open_backup(self):
+        """ архив строк лога на дозапись, каждая обработка файлов добавляет в архив отдельный поток xz
+        данные записанные после сохранения состояния (checkpoint) отбрасываются
+
+        :rtype: lzma.LZMAFile
+        """
+        if not self.backup_path.parent.exists():
+            self.backup_path.parent.mkdir(parents=True)
+        with self.backup_path.open('ab') as f:
+            f.truncate(self.backup_size)
+        return lzma.open(str(self.backup_path), 'at', preset=BACKUP_PRESET)
+
+    def replay(self, cache_path):
+        """ обработка событий из кэша вместо разбора файлов лога, строки лога (self.lines) при этом не собираются
+
+        :type cache_path: pathlib.Path
+        :rtype: bool
+        :return: False если кэша нет или он устарел
+        """
+        records = read_cache(path=cache_path, fields=self.events_fields)
+        if records is None:
+            return False
+        self.apply_records(records=records)
+        self.log_stats()
+        return True
+
+    def log_stats(self):
+        """ итоги обработки миссии - одинаково для processing, replay и feed """
+        self.log_skipped_lines()
+        self.log_corrected_events()
+        self.log_handlers_stats()
+
+    def log_skipped_lines(self):
+        if self.skipped_lines:
+            logger.info('skipped decoding: {}'.format(
+                ', '.join('AType:{} - {}'.format(*item) for item in sorted(self.skipped_lines.items()))))
+
+    def log_corrected_events(self):
+        if self.corrected_events:
+            logger.info('corrected events: {}'.format(
+                ', '.join('{} - {}'.format(*item) for item in sorted(self.corrected_events.items()))))
+
+    def log_handlers_stats(self):
+        for name, seconds in self.handlers_time.most_common():
+            calls = self.handlers_calls[name]
+            logger.info('{}: {} calls, {:.3f} sec, {:.1f} us/call'.format(name, calls, seconds, seconds / calls * 10 ** 6))
+
+    def apply_files_events(self, files_events, cache_path=None, backup=None):
+        """ события всех файлов применяются одним потоком - окно упорядочивания работает на границах файлов
+
+        :param files_events: строки и события по файлам лога
+        :type files_events: collections.Iterable[collections.Iterable[(str, tuple | Exception | None)]]
+        :type cache_path: pathlib.Path | None
+        :type backup: lzma.LZMAFile | None
+        """
+        if cache_path is None:
+            self.apply_records(records=self.files_records(files_events=files_events, backup=backup))
+            return
+        with EventsCacheWriter(path=cache_path, fields=self.events_fields) as cache:
+            self.apply_records(records=self.files_records(files_events=files_events, cache=cache, backup=backup))
 
-                    # стастистика работает только с двумя коалициями
-                    if 'coal_id' in data:
-                        data['coal_id'] = COALITION_ALIAS[data['coal_id']]
+    def files_records(self, files_events, cache=None, backup=None):
+        """ записи событий файлов одним потоком, в кэш записи пишутся блоками по файлам
 
-                    # обновление последней позиции объектов события
-                    if 'pos' in data:
-                        self.update_last_pos(data=data)
+        :type files_events: collections.Iterable[collections.Iterable[(str, tuple | Exception | None)]]
+        :type cache: EventsCacheWriter | None
+        :type backup: lzma.LZMAFile | None
+        :rtype: collections.Iterable[tuple]
+        """
+        for events in files_events:
+            records = self.collect_lines(events=events, backup=backup)
+            if cache is not None:
+                records = list(records)
+                cache.write(events=records)
+            yield from records
+
+    def collect_lines(self, events, backup=None):
+        """ сохранение строк лога (в архив или self.lines) и отбрасывание "плохих" строк
+
+        :type events: collections.Iterable[(str, tuple | Exception | None)]
+        :type backup: lzma.LZMAFile | None
+        :rtype: collections.Iterable[tuple]
+        """
+        save_line = self.lines.append if backup is None else backup.write
+        for line, event in events:
+            # игнорируем "плохие" строки без
+            if event is None:
+                log_bad_line(line=line, error=event)
+                continue
+            save_line(line)
+
+            if isinstance(event, Exception):
+                log_bad_line(line=line, error=event)
+                continue
+            yield event
+
+    def apply_records(self, records):
+        """ события проходят через окно упорядочивания, оставшиеся в окне события применяются в конце
+
+        :type records: collections.Iterable[tuple]
+        """
+        records = reorder_events(events=records, window=self.reorder_window, counters=self.corrected_events,
+                                 repeatable_atypes=self.repeatable_atypes)
+        for event in records:
+            atype_id = event.atype_id
 
-                    # обновление ratio во время взлета, посадки, убийства, прыжка, завершения
-                    if atype_id in (3, 4, 5, 6, 18):
-                        self.update_ratio(data=data)
+            if event.tik > self.tik_last:
+                self.tik_last = event.tik
 
-                    self.events_handlers[atype_id](**data)
+            if atype_id in self.events_fields:
+                self.skipped_lines[atype_id] += 1
 
-                    self.update_last_tik(data=data)
+            handler, before, after = self.events_handlers[atype_id]
+            for hook in before:
+                hook(event)
+            handler(*event)
+            for hook in after:
+                hook(event)
 
-    def logger_event(self, event):
+    def logger_event(self, event_type, actor=None, target=None, damage=0.0, flags=0, pos=None, status=None):
         """
-        :type event: dict
+        :type event_type: str
+        :type actor: Object | Sortie | None
+        :type target: Object | None
+        :type damage: float
+        :type flags: int
+        :type pos: dict | None
+        :type status: str | None
         """
-        event['tik'] = self.tik_last
-        self.log_entries.append(event)
+        self.log_entries.append(event_type, self.tik_last, actor=actor, target=target, damage=damage, flags=flags,
+                                pos=pos, status=status)
 
     def add_active_sortie(self, sortie):
         """
         :type sortie: Sortie
         """
-        self.active_sorties[sortie.coal_id].add(sortie)
+        sorties = self.active_sorties[sortie.coal_id]
+        if sortie not in sorties:
+            sorties.add(sortie)
+            self.active_sorties_total += 1
 
     def rm_active_sortie(self, sortie):
         """
         :type sortie: Sortie
         """
-        self.active_sorties[sortie.coal_id].discard(sortie)
+        sorties = self.active_sorties[sortie.coal_id]
+        if sortie in sorties:
+            sorties.remove(sortie)
+            self.active_sorties_total -= 1
 
     def get_areas(self, exclude_coals=None):
         """
@@ -145,6 +521,17 @@ class MissionReport:
         exclude_coals = exclude_coals or []
         return [a for a in self.areas.values() if a.is_enabled and a.boundary and a.coal_id not in exclude_coals]
 
+    def find_areas(self, pos, exclude_coals=()):
+        """ включенные зоны в которых находится точка
+
+        :type pos: dict
+        :type exclude_coals: tuple | list
+        :rtype: collections.Iterable[Area]
+        """
+        if self.areas_index is None:
+            self.areas_index = AreasIndex(areas=self.get_areas())
+        return self.areas_index.find(pos=pos, exclude_coals=exclude_coals)
+
     def get_airfields(self, include_coals=None):
         """
         :type include_coals: list|None
@@ -155,6 +542,14 @@ class MissionReport:
         else:
             return self.airfields.values()
 
+    def get_coal_id(self, country_id):
+        """
+        :type country_id: int
+        :rtype: int
+        """
+        # стастистика работает только с двумя коалициями
+        return COALITION_ALIAS[self.countries[country_id]]
+
     def get_object(self, object_id, create=True):
         """
         :type object_id: int
@@ -193,37 +588,36 @@ class MissionReport:
                 self.objects_id_map[object_id] = obj
         return obj
 
-    def update_last_pos(self, data):
-        if is_pos_correct(pos=data['pos']):
-            for key in ('attacker_id', 'target_id', 'aircraft_id', 'bot_id', 'object_id'):
-                if key in data and data[key]:
-                    obj = self.get_object(object_id=data[key], create=False)
+    def update_last_pos(self, event):
+        if is_pos_correct(pos=event.pos):
+            for key in event.objects_fields:
+                object_id = getattr(event, key)
+                if object_id:
+                    obj = self.get_object(object_id=object_id, create=False)
                     if obj:
-                        obj.update_position(pos=data['pos'])
+                        obj.update_position(pos=event.pos)
 
-    def update_last_tik(self, data):
-        for key in ('attacker_id', 'target_id', 'aircraft_id', 'bot_id', 'object_id'):
-            if key in data and data[key]:
-                obj = self.get_object(object_id=data[key], create=False)
-                if obj and obj.sortie and obj.sortie.tik_last < data['tik']:
-                    obj.sortie.tik_last = data['tik']
+    def update_last_tik(self, event):
+        for key in event.objects_fields:
+            object_id = getattr(event, key)
+            if object_id:
+                obj = self.get_object(object_id=object_id, create=False)
+                if obj and obj.sortie and obj.sortie.tik_last < event.tik:
+                    obj.sortie.tik_last = event.tik
 
     def get_current_ratio(self, sortie_coal_id):
         player_side = len(self.active_sorties[sortie_coal_id])
-        enemy_side = 0
-        for coal_id, players in self.active_sorties.items():
-            if coal_id != sortie_coal_id:
-                enemy_side += len(players)
-        total = player_side + enemy_side
+        total = self.active_sorties_total
         if total < 2:
             return 1
         else:
             return round((1 - player_side / total) * 2, 2)
 
-    def update_ratio(self, data):
-        for key in ('attacker_id', 'target_id', 'id', 'aircraft_id', 'bot_id', 'object_id'):
-            if key in data and data[key]:
-                obj = self.get_object(object_id=data[key], create=False)
+    def update_ratio(self, event):
+        for key in event.objects_fields:
+            object_id = getattr(event, key)
+            if object_id:
+                obj = self.get_object(object_id=object_id, create=False)
                 if obj and obj.sortie:
                     current_ratio = self.get_current_ratio(sortie_coal_id=obj.sortie.coal_id)
                     obj.sortie.update_ratio(current_ratio=current_ratio)
@@ -276,7 +670,7 @@ class MissionReport:
         # бывают события дубли - проверяем
         if sortie and not sortie.is_ended:
             sortie.ending(tik=tik, cartridges=cartridges, shells=shells, bombs=bombs, rockets=rockets)
-            self.logger_event({'type': 'end', 'sortie': sortie, 'pos': pos})
+            self.logger_event('end', actor=sortie, pos=pos)
             self.rm_active_sortie(sortie=sortie)
 
     def event_takeoff(self, tik, aircraft_id, pos):
@@ -284,20 +678,21 @@ class MissionReport:
         if aircraft:
             aircraft.takeoff(tik=tik)
             if aircraft.sortie:
-                self.logger_event({'type': 'takeoff', 'aircraft': aircraft, 'pos': pos})
+                self.logger_event('takeoff', actor=aircraft, pos=pos)
 
     def event_landing(self, tik, aircraft_id, pos):
         aircraft = self.get_object(object_id=aircraft_id)
         if aircraft:
             aircraft.landing(tik=tik, pos=pos)
             if aircraft.sortie:
-                self.logger_event({'type': 'landed', 'pos': pos, 'aircraft': aircraft, 'is_rtb': aircraft.is_rtb,
-                                   'status': aircraft.life_status.status, 'is_killed': aircraft.is_killed})
+                flags = (RTB if aircraft.is_rtb else 0) | (KILLED if aircraft.is_killed else 0)
+                self.logger_event('landed', actor=aircraft, flags=flags, pos=pos, status=aircraft.life_status.status)
 
     def event_mission_end(self, tik):
         self.is_correctly_completed = True
 
-    def event_mission_result(self, tik, object_id, coal_id, task_type_id, success, icon_type_id, pos):
+    def event_mission_result(self, tik, object_id, pos, coal_id, task_type_id, success, icon_type_id):
+        coal_id = COALITION_ALIAS[coal_id]
         if task_type_id == 0 and coal_id != 0 and success:
             if not self.winning_coal_id:
                 self.winning_coal_id = coal_id
@@ -363,18 +758,27 @@ class MissionReport:
                 self.winning_coal_id = coal_id
                 self.winning_coal_type = 15
 
-    def event_airfield(self, tik, airfield_id, country_id, coal_id, aircraft_id_list, pos):
+    def event_airfield(self, tik, airfield_id, country_id, pos, aircraft_id_list):
+        coal_id = self.get_coal_id(country_id=country_id)
         if airfield_id in self.airfields:
-            self.airfields[airfield_id].update(country_id=country_id, coal_id=coal_id)
+            airfield = self.airfields[airfield_id]
+            if airfield.coal_id != coal_id:
+                self.airfields_index.remove(airfield)
+                airfield.update(country_id=country_id, coal_id=coal_id)
+                self.airfields_index.add(airfield)
+            else:
+                airfield.update(country_id=country_id, coal_id=coal_id)
         else:
             airfield = Airfield(airfield_id=airfield_id, country_id=country_id, coal_id=coal_id, pos=pos)
             self.airfields[airfield_id] = airfield
+            self.airfields_index.add(airfield)
 
-    def event_player(self, tik, aircraft_id, bot_id, account_id, profile_id, name, pos, aircraft_name, country_id,
-                     coal_id, airfield_id, airstart, parent_id, payload_id, fuel, skin, weapon_mods_id,
-                     cartridges, shells, bombs, rockets, form, is_player, is_tracking_stat):
+    def event_player(self, tik, aircraft_id, bot_id, cartridges, shells, bombs, rockets, pos, profile_id, account_id,
+                     name, aircraft_name, country_id, form, airfield_id, airstart, parent_id, is_player,
+                     is_tracking_stat, payload_id, fuel, skin, weapon_mods_id):
         # игнорируем записи про ботов
         if is_player:
+            coal_id = self.get_coal_id(country_id=country_id)
             sortie = Sortie(mission=self, tik=tik, aircraft_id=aircraft_id, bot_id=bot_id, account_id=account_id,
                             profile_id=profile_id, name=name, pos=pos, aircraft_name=aircraft_name, country_id=country_id,
                             coal_id=coal_id, airfield_id=airfield_id, airstart=airstart, parent_id=parent_id,
@@ -389,25 +793,31 @@ class MissionReport:
 
             current_ratio = self.get_current_ratio(sortie_coal_id=sortie.coal_id)
             sortie.update_ratio(current_ratio=current_ratio)
-            self.logger_event({'type': 'respawn', 'sortie': sortie, 'pos': pos})
+            self.logger_event('respawn', actor=sortie, pos=pos)
 
     def event_group(self, tik, group_id, members_id, leader_id):
         pass
 
-    def event_game_object(self, tik, object_id, object_name, country_id, coal_id, name, parent_id):
+    def event_game_object(self, tik, object_id, object_name, country_id, name, parent_id):
         obj = Object(mission=self, object_id=object_id, object_name=object_name,
-                     country_id=country_id, coal_id=coal_id, parent_id=parent_id)
+                     country_id=country_id, coal_id=self.get_coal_id(country_id=country_id), parent_id=parent_id)
         self.objects_id_map[object_id] = obj
 
-    def event_influence_area(self, tik, area_id, country_id, coal_id, enabled, in_air):
+    def event_influence_area(self, tik, area_id, country_id, enabled, in_air):
+        coal_id = self.get_coal_id(country_id=country_id)
         if area_id in self.areas:
-            self.areas[area_id].update(country_id=country_id, coal_id=coal_id, enabled=enabled, in_air=in_air)
+            area = self.areas[area_id]
+            # счетчики самолетов в зоне обновляются часто, индекс зависит только от коалиции и включения зоны
+            if area.coal_id != coal_id or area.is_enabled != enabled:
+                self.areas_index = None
+            area.update(country_id=country_id, coal_id=coal_id, enabled=enabled, in_air=in_air)
         else:
             area = Area(area_id=area_id, country_id=country_id, coal_id=coal_id, enabled=enabled, in_air=in_air)
             self.areas[area_id] = area
 
     def event_influence_area_boundary(self, tik, area_id, boundary):
         self.areas[area_id].boundary = boundary
+        self.areas_index = None
 
     def event_log_version(self, tik, version):
         pass
@@ -428,7 +838,7 @@ class MissionReport:
             bot.bot_eject_leave(tik=tik, pos=pos)
             if bot.sortie:
                 self.rm_active_sortie(sortie=bot.sortie)
-                self.logger_event({'type': 'bailout', 'bot': bot, 'pos': pos})
+                self.logger_event('bailout', actor=bot, pos=pos)
 
     def event_round_end(self, tik):
         pass
@@ -451,17 +861,29 @@ class MissionReport:
 
 
 class Area:
+    __slots__ = ('id', 'country_id', 'coal_id', 'is_enabled', 'in_air', '_boundary', 'polygon')
+
     def __init__(self, area_id, country_id, coal_id, enabled, in_air):
         self.id = area_id
         self.country_id = country_id
         self.coal_id = coal_id
         self.is_enabled = enabled
         self.in_air = in_air
-        self.boundary = None
+        self._boundary = None
+        self.polygon = None
+
+    @property
+    def boundary(self):
+        return self._boundary
+
+    @boundary.setter
+    def boundary(self, boundary):
+        self._boundary = boundary
+        self.polygon = Polygon(boundary) if boundary else None
 
     def is_inside(self, pos):
-        if self.boundary and is_pos_correct(pos=pos):
-            return point_in_polygon(point=pos, polygon=self.boundary)
+        if self.polygon and is_pos_correct(pos=pos):
+            return self.polygon.contains(x=pos['x'], z=pos['z'])
         else:
             return False
 
@@ -473,6 +895,11 @@ class Area:
 
 
 class Airfield:
+    __slots__ = ('id', 'country_id', 'coal_id', 'pos')
+
+    # радиус аэродрома
+    radius = 4000
+
     def __init__(self, airfield_id, country_id, coal_id, pos):
         self.id = airfield_id
         self.country_id = country_id
@@ -481,7 +908,7 @@ class Airfield:
 
     def on_airfield(self, pos):
         if is_pos_correct(pos=self.pos) and is_pos_correct(pos=pos):
-            return distance(self.pos, pos) <= 4000
+            return distance(self.pos, pos) <= self.radius
         else:
             return False
 
@@ -497,6 +924,13 @@ class Object:
     :type parent: Object | None
     :type children: dict[int, Object]
     """
+    # объектов в миссии десятки тысяч, большинство из них (постройки и т.п.) не участвуют в бою -
+    # без __dict__ и с созданием словарей при первом обращении
+    __slots__ = ('index', 'mission', 'id', 'log_name', 'cls', 'cls_base', 'country_id', 'coal_id', 'parent_id',
+                 'parent', 'bot', '_children', 'sortie', 'last_pos', 'life_status', 'is_deinitialized',
+                 'is_takeoff', 'is_killed', 'is_bailout', 'is_captured', 'is_rtb', 'on_ground', 'damage',
+                 '_damagers', 'top_damagers', 'killers', '_killboard', '_assistboard')
+
     def __init__(self, mission, object_id, object_name, country_id, coal_id, parent_id):
         self.index = mission.index()
         self.mission = mission
@@ -510,9 +944,7 @@ class Object:
         self.parent_id = parent_id
         self.parent = None
         self.bot = None  # для пилотов
-        # пилоты, стрелки, турели т.п.
-        # словарь чтобы избежать связей с забаговаными объектами т.к. новый нормальный объект заменит багованый
-        self.children = {}
+        self._children = None
         if self.parent_id:
             self.set_parent(self.parent_id)
 
@@ -547,14 +979,54 @@ class Object:
         self.is_rtb = False  # return to base
         self.on_ground = True
         self.damage = 0.0
-        self.damagers = defaultdict(int)
+        self._damagers = None
+        # два дамагера с наибольшим дамагом, обновляются при каждом повреждении
+        self.top_damagers = ()
         self.killers = []
-        self.killboard = defaultdict(set)
-        self.assistboard = defaultdict(set)
+        self._killboard = None
+        self._assistboard = None
 
     def __hash__(self):
         return self.index
 
+    @property
+    def children(self):
+        """ пилоты, стрелки, турели т.п.
+        словарь чтобы избежать связей с забаговаными объектами т.к. новый нормальный объект заменит багованый
+
+        :rtype: dict[int, Object]
+        """
+        if self._children is None:
+            self._children = {}
+        return self._children
+
+    @property
+    def damagers(self):
+        """
+        :rtype: dict[Object, float]
+        """
+        if self._damagers is None:
+            self._damagers = defaultdict(int)
+        return self._damagers
+
+    @property
+    def killboard(self):
+        """
+        :rtype: dict[str, set[Object]]
+        """
+        if self._killboard is None:
+            self._killboard = defaultdict(set)
+        return self._killboard
+
+    @property
+    def assistboard(self):
+        """
+        :rtype: dict[str, set[Object]]
+        """
+        if self._assistboard is None:
+            self._assistboard = defaultdict(set)
+        return self._assistboard
+
     def set_parent(self, parent_id):
         """
         :type parent_id: int
@@ -568,13 +1040,14 @@ class Object:
 
     def captured(self):
         self.is_captured = True
-        for ch in self.children.values():
+        # без обращения к children - не создаем пустой словарь для объектов без детей
+        for ch in (self._children.values() if self._children else ()):
             if not ch.is_bailout:
                 ch.is_captured = True
 
     def uncaptured(self):
         self.is_captured = False
-        for ch in self.children.values():
+        for ch in (self._children.values() if self._children else ()):
             if not ch.is_bailout:
                 ch.is_captured = False
 
@@ -668,9 +1141,10 @@ class Object:
             attacker = None
         if attacker:
             self.damagers[attacker] += damage
+            self.update_top_damagers(attacker=attacker, damage=damage)
         is_friendly_fire = True if attacker and attacker.coal_id == self.coal_id else False
-        self.mission.logger_event({'type': 'damage', 'damage': damage, 'pos': pos, 'attacker': attacker,
-                                   'target': self, 'is_friendly_fire': is_friendly_fire})
+        self.mission.logger_event('damage', actor=attacker, target=self, damage=damage,
+                                  flags=FRIENDLY_FIRE if is_friendly_fire else 0, pos=pos)
 
     def got_killed(self, attacker=None, pos=None, force_by_dmg=False):
         """
@@ -681,12 +1155,11 @@ class Object:
             return
 
         self.life_status.destroy()
-        # дамагеры отсортированные по величине дамага
-        damagers = [a[0] for a in sorted(self.damagers.items(), key=operator.itemgetter(1), reverse=True)]
+        # два дамагера с наибольшим дамагом
+        damagers = list(self.top_damagers)
         if attacker:
-            if attacker in damagers:
-                damagers.remove(attacker)
-                damagers.insert(0, attacker)
+            if self._damagers and attacker in self._damagers:
+                damagers = [attacker] + [d for d in damagers if d is not attacker][:1]
         # если убийца не известен - вычисляем убийцу по повреждениям
         else:
             # если атакующий не известен и цель самолет в полете -
@@ -704,7 +1177,11 @@ class Object:
 
         if attacker:
             self.is_killed = True
-            self.killers = damagers
+            # все дамагеры по убыванию дамага, убийца первым - полный список сортируется один раз при уничтожении
+            self.killers = sorted(self._damagers, key=self._damagers.get, reverse=True) if self._damagers else []
+            if attacker in self.killers:
+                self.killers.remove(attacker)
+                self.killers.insert(0, attacker)
             attacker.killboard[self.cls].add(self)
             # добавляем второго по величине дамага в ассисты (если надамагал больше 1%)
             if len(damagers) > 1 and self.damagers[damagers[1]] > 1:
@@ -715,8 +1192,43 @@ class Object:
                     attacker.parent.killboard[self.cls].add(self)
         # если есть убийца, или это игровое событие - пишем в лог
         if attacker or not force_by_dmg:
-            self.mission.logger_event({'type': 'kill', 'attacker': attacker, 'pos': pos,
-                                       'target': self, 'is_friendly_fire': is_friendly_fire})
+            self.mission.logger_event('kill', actor=attacker, target=self,
+                                      flags=FRIENDLY_FIRE if is_friendly_fire else 0, pos=pos)
+
+    def update_top_damagers(self, attacker, damage):
+        """ порядок как при сортировке damagers по убыванию дамага - при равном дамаге первым идет
+        дамагер раньше попавший в damagers
+
+        :type attacker: Object
+        :type damage: int | float
+        """
+        # отрицательный дамаг (DMG бывает отрицательным) может опустить атакующего ниже третьего дамагера
+        if damage < 0:
+            self.top_damagers = tuple(sorted(self.damagers, key=self.damagers.get, reverse=True)[:2])
+            return
+        top = [d for d in self.top_damagers if d is not attacker]
+        # дамаг атакующего вырос - он может только подняться выше, остальные дамагеры не меняются
+        position = len(top)
+        while position and self.is_damager_before(attacker, top[position - 1]):
+            position -= 1
+        top.insert(position, attacker)
+        self.top_damagers = tuple(top[:2])
+
+    def is_damager_before(self, damager, other):
+        """
+        :type damager: Object
+        :type other: Object
+        :rtype: bool
+        """
+        damage, other_damage = self.damagers[damager], self.damagers[other]
+        if damage != other_damage:
+            return damage > other_damage
+        # равный дамаг (редко) - по порядку добавления
+        for obj in self.damagers:
+            if obj is damager:
+                return True
+            if obj is other:
+                return False
 
     def killed_by_damage(self, dmg_pct=0):
         if not self.is_killed and (self.damage > dmg_pct or self.is_captured):
@@ -742,15 +1254,15 @@ class Object:
         self.last_pos = pos
 
     def is_aircraft_rtb(self, pos):
-        for af in self.mission.get_airfields(include_coals=[self.coal_id]):
-            if af.on_airfield(pos=pos):
-                return True
+        for _ in self.mission.airfields_index.find(pos=pos, coal_id=self.coal_id):
+            return True
         return False
 
     def is_on_enemy_territory(self, pos):
-        for area in self.mission.get_areas(exclude_coals=[0, self.coal_id]):
-            if area.is_inside(pos=pos):
-                return True
+        if not is_pos_correct(pos=pos):
+            return False
+        for _ in self.mission.find_areas(pos=pos, exclude_coals=(0, self.coal_id)):
+            return True
         return False
 
     def is_attack_itself(self, attacker):
@@ -771,6 +1283,13 @@ class Sortie:
     :type bot: Object | None
     :type mission: MissionReport
     """
+    __slots__ = ('index', 'mission', 'aircraft_id', 'bot_id', 'aircraft', 'bot', 'pos_start', 'account_id',
+                 'profile_id', 'nickname', 'aircraft_name', 'cls', 'cls_base', 'country_id', 'coal_id', 'airfield_id',
+                 'is_airstart', 'parent_id', 'parent', 'payload_id', 'fuel', 'skin', 'weapon_mods_id', 'tik_spawn',
+                 'tik_takeoff', 'tik_bailout', 'tik_landed', 'tik_end', 'tik_last', 'used_cartridges', 'used_shells',
+                 'used_bombs', 'used_rockets', 'hit_bullets', 'hit_bombs', 'hit_rockets', 'hit_shells',
+                 '_ratio_sum', '_ratio_count', 'ratio', 'is_disco', 'is_ended', 'sortie_db')
+
     def __init__(self, mission, tik, aircraft_id, bot_id, account_id, profile_id, name, pos, aircraft_name, country_id,
                  coal_id, airfield_id, airstart, parent_id, payload_id, fuel, skin, weapon_mods_id,
                  cartridges, shells, bombs, rockets):
@@ -821,12 +1340,16 @@ class Sortie:
         self.hit_rockets = 0
         self.hit_shells = 0
 
-        self._ratio_list = []
+        # среднее ratio вылета - сумма и количество значений
+        self._ratio_sum = 0
+        self._ratio_count = 0
         self.ratio = 1
 
         # вылет завершен
         self.is_disco = False
         self.is_ended = False
+        # запись вылета в базе, устанавливается при сохранении статистики
+        self.sortie_db = None
 
         # логи могут баговать и идти не по порядку
         aircraft = mission.get_object(object_id=self.aircraft_id, create=False)
@@ -957,11 +1480,16 @@ class Sortie:
         return self.bot.life_status if self.bot else BotLifeStatus()
 
     def update_ratio(self, current_ratio):
-        self._ratio_list.append(current_ratio)
-        self.ratio = round((sum(self._ratio_list) / len(self._ratio_list)), 2)
+        self._ratio_sum += current_ratio
+        self._ratio_count += 1
+        self.ratio = round((self._ratio_sum / self._ratio_count), 2)
 
     def is_ended_by_timeout(self, timeout, tik):
         if not self.is_ended or (tik - self.tik_end) / 50 < timeout:
             return False
         else:
             return True
+
+
+# типы объектов которые пишутся в checkpoint ссылками
+checkpoint_types = (Object, Sortie)
@@ -0,0 +1,155 @@
+""" пространственные индексы зон влияния и аэродромов
+
+многоугольник зоны хранит ребра по горизонтальным полосам (по z) - луч из точки пересекает только ребра
+полосы в которую попадает точка, зоны раскладываются по ячейкам равномерной сетки по ограничивающим прямоугольникам,
+аэродромы - по ячейкам сетки с шагом равным радиусу аэродрома
+"""
+from collections import defaultdict
+
+from mission_report.helpers import distance, is_pos_correct
+
+
+class Polygon:
+    """ многоугольник в плоскости x, z """
+    __slots__ = ('min_x', 'min_z', 'max_x', 'max_z', 'band_size', 'bands')
+
+    def __init__(self, boundary):
+        """
+        :param boundary: вершины (x, z) или (x, y, z) как в логе (AType 14)
+        """
+        points = [(p[0], p[-1]) for p in boundary]
+        self.min_x = min(x for x, z in points)
+        self.max_x = max(x for x, z in points)
+        self.min_z = min(z for x, z in points)
+        self.max_z = max(z for x, z in points)
+        # в среднем по несколько ребер на полосу
+        count = max(1, len(points) // 2)
+        self.band_size = (self.max_z - self.min_z) / count or 1.0
+        self.bands = [[] for _ in range(count)]
+        for i, (p2x, p2z) in enumerate(points):
+            p1x, p1z = points[i - 1]
+            low, high = min(p1z, p2z), max(p1z, p2z)
+            # горизонтальные ребра луч не пересекает
+            if low == high:
+                continue
+            edge = (low, high, max(p1x, p2x), p1x, p1z, p2x, p2z)
+            for band in range(self.band(low), self.band(high) + 1):
+                self.bands[band].append(edge)
+
+    def band(self, z):
+        """
+        :type z: float
+        :rtype: int
+        """
+        return min(int((z - self.min_z) / self.band_size), len(self.bands) - 1)
+
+    def contains(self, x, z):
+        """ проверка аналогична helpers.point_in_polygon
+
+        :type x: float
+        :type z: float
+        :rtype: bool
+        """
+        if not (self.min_x <= x <= self.max_x and self.min_z <= z <= self.max_z):
+            return False
+        inside = False
+        for low, high, max_x, p1x, p1z, p2x, p2z in self.bands[self.band(z)]:
+            if low < z <= high and x <= max_x:
+                if p1x == p2x or x <= (z - p1z) * (p2x - p1x) / (p2z - p1z) + p1x:
+                    inside = not inside
+        return inside
+
+
+class AreasIndex:
+    """ зоны влияния по ячейкам сетки, в ячейке - зоны ограничивающий прямоугольник которых ее пересекает
+
+    :type cells: dict[(int, int), list]
+    """
+    # максимальное количество ячеек по стороне сетки
+    grid_size = 64
+
+    def __init__(self, areas):
+        """
+        :param areas: зоны с границами (Area.polygon)
+        :type areas: list
+        """
+        self.cells = defaultdict(list)
+        self.cell_size = 1.0
+        if not areas:
+            return
+        polygons = [area.polygon for area in areas]
+        width = max(p.max_x for p in polygons) - min(p.min_x for p in polygons)
+        height = max(p.max_z for p in polygons) - min(p.min_z for p in polygons)
+        self.cell_size = max(width, height) / self.grid_size or 1.0
+        for area in areas:
+            polygon = area.polygon
+            for cell_x in range(self.cell(polygon.min_x), self.cell(polygon.max_x) + 1):
+                for cell_z in range(self.cell(polygon.min_z), self.cell(polygon.max_z) + 1):
+                    self.cells[(cell_x, cell_z)].append(area)
+
+    def cell(self, value):
+        """
+        :type value: float
+        :rtype: int
+        """
+        return int(value // self.cell_size)
+
+    def find(self, pos, exclude_coals=()):
+        """ зоны в которых находится точка
+
+        :type pos: dict
+        :type exclude_coals: tuple | list
+        :rtype: collections.Iterable
+        """
+        x, z = pos['x'], pos['z']
+        for area in self.cells.get((self.cell(x), self.cell(z)), ()):
+            if area.coal_id not in exclude_coals and area.polygon.contains(x, z):
+                yield area
+
+
+class AirfieldsIndex:
+    """ аэродромы коалиций по ячейкам сетки размером с радиус аэродрома -
+    точка в радиусе аэродрома находится в той же или соседней ячейке
+
+    :type cells: dict[(int, int, int), list]
+    """
+
+    def __init__(self, radius):
+        """
+        :type radius: int | float
+        """
+        self.radius = radius
+        self.cells = defaultdict(list)
+
+    def cell(self, coal_id, pos):
+        """
+        :type coal_id: int
+        :type pos: dict
+        :rtype: (int, int, int)
+        """
+        return coal_id, int(pos['x'] // self.radius), int(pos['z'] // self.radius)
+
+    def add(self, airfield):
+        # аэродромы без позиции не могут быть найдены
+        if is_pos_correct(pos=airfield.pos):
+            self.cells[self.cell(coal_id=airfield.coal_id, pos=airfield.pos)].append(airfield)
+
+    def remove(self, airfield):
+        if is_pos_correct(pos=airfield.pos):
+            self.cells[self.cell(coal_id=airfield.coal_id, pos=airfield.pos)].remove(airfield)
+
+    def find(self, pos, coal_id):
+        """ аэродромы коалиции в радиусе которых находится точка
+
+        :type pos: dict
+        :type coal_id: int
+        :rtype: collections.Iterable
+        """
+        if not is_pos_correct(pos=pos):
+            return
+        coal_id, cell_x, cell_z = self.cell(coal_id=coal_id, pos=pos)
+        for x in (cell_x - 1, cell_x, cell_x + 1):
+            for z in (cell_z - 1, cell_z, cell_z + 1):
+                for airfield in self.cells.get((coal_id, x, z), ()):
+                    if distance(airfield.pos, pos) <= self.radius:
+                        yield airfield
@@ -8,6 +8,8 @@ class SortieStatus:
     # air_crash = 'air_crash'
     shotdown = 'shotdown'
 
+    __slots__ = ('status',)
+
     def __init__(self, is_airstart=False):
         self.status = self.in_flight if is_airstart else self.not_takeoff
 
@@ -75,6 +77,8 @@ class LifeStatus:
     damaged = 'damaged'
     destroyed = 'destroyed'
 
+    __slots__ = ('status',)
+
     def __init__(self):
         self.status = self.unharmed
 
@@ -118,6 +122,8 @@ class BotLifeStatus(LifeStatus):
     damaged = wounded
     destroyed = dead
 
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
         self.status = self.healthy
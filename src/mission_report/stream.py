@@ -0,0 +1,111 @@
+from collections import deque
+import logging
+
+from mission_report import parse_mission_log_line
+
+
+logger = logging.getLogger('mission_report')
+
+
+def read_events(file_path, parse=parse_mission_log_line.parse_event, atypes=None):
+    """ чтение и разбор файла лога
+
+    строки без AType возвращаются с None, не разобранные строки - с исключением парсера,
+    строки событий не входящих в atypes пропускаются без разбора
+
+    :type file_path: pathlib.Path
+    :type atypes: collections.Container[int] | None
+    :rtype: collections.Iterable[(str, tuple | Exception | None)]
+    """
+    with file_path.open() as f:
+        for line in f:
+            if 'AType' not in line:
+                yield line, None
+                continue
+            if atypes is not None:
+                try:
+                    atype_id = int(line.partition('AType:')[2][:2])
+                except ValueError:
+                    # ошибку разбора вернет парсер
+                    pass
+                else:
+                    if atype_id not in atypes:
+                        continue
+            try:
+                yield line, parse(line)
+            except (AttributeError, ValueError, parse_mission_log_line.UnexpectedATypeWarning) as e:
+                yield line, e
+
+
+def reorder_events(events, window, counters, repeatable_atypes=()):
+    """ окно последних событий упорядоченное по tik: события пришедшие с опозданием ставятся на свое место,
+    точные дубли событий в окне отбрасываются, в окне не больше window событий
+
+    :type events: collections.Iterable[tuple]
+    :type window: int
+    :param counters: счетчики исправлений - duplicate, reordered и late (опоздание больше окна)
+    :type counters: collections.Counter
+    :param repeatable_atypes: ID событий которые могут законно повторяться (попадания и т.п.)
+    :type repeatable_atypes: collections.Container[int]
+    :rtype: collections.Iterable[tuple]
+    """
+    buffer = deque()
+    # tik последнего выданного события
+    tik_released = None
+    for event in events:
+        tik = event.tik
+        if tik_released is not None and tik < tik_released:
+            counters['late'] += 1
+            yield event
+            continue
+        # дубль возможен только если в окне есть события с таким же tik или позже, быстрая проверка
+        # сравнением кортежей, затем с учетом типа события (у разных событий могут быть одинаковые значения полей)
+        if (buffer and buffer[-1].tik >= tik and event.atype_id not in repeatable_atypes and event in buffer
+                and any(prev.atype_id == event.atype_id and prev == event for prev in buffer)):
+            counters['duplicate'] += 1
+            continue
+        # место события в окне - после событий с таким же tik
+        if not buffer or buffer[-1].tik <= tik:
+            buffer.append(event)
+        else:
+            counters['reordered'] += 1
+            position = len(buffer) - 1
+            while position and buffer[position - 1].tik > tik:
+                position -= 1
+            buffer.insert(position, event)
+        if len(buffer) > window:
+            released = buffer.popleft()
+            tik_released = released.tik
+            yield released
+    yield from buffer
+
+
+def log_bad_line(line, error):
+    """
+    :type line: str
+    :type error: Exception | None
+    """
+    if error is None:
+        logger.warning('ignored bad string: [{}]'.format(line))
+    elif isinstance(error, parse_mission_log_line.UnexpectedATypeWarning):
+        logger.warning('unexpected atype: [{}]'.format(line))
+    else:
+        logger.error('bad line: [{}]'.format(line.strip()))
+
+
+def iter_events(files, atypes=None, parser='tokenizer'):
+    """ ленивый поток записей событий из файлов лога, "плохие" строки пропускаются с записью в лог
+
+    :type files: collections.Iterable[pathlib.Path]
+    :param atypes: ID нужных событий, строки остальных событий не разбираются
+    :type atypes: collections.Container[int] | None
+    :type parser: str
+    :rtype: collections.Iterable[tuple]
+    """
+    parse = parse_mission_log_line.events_parsers[parser]
+    for file_path in files:
+        for line, event in read_events(file_path=file_path, parse=parse, atypes=atypes):
+            if event is None or isinstance(event, Exception):
+                log_bad_line(line=line, error=event)
+                continue
+            yield event
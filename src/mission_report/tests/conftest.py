@@ -1,8 +1,14 @@
 import pytest
 
+from ..parse_mission_log_line import parsers
 from ..report import Airfield, Area, MissionReport, Object, Sortie
 
 
+@pytest.fixture(params=sorted(parsers))
+def parse(request):
+    return parsers[request.param]
+
+
 @pytest.fixture
 def mission():
     mission_ = MissionReport(objects={
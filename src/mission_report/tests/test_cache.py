@@ -0,0 +1,71 @@
+import pathlib
+
+import pytest
+
+from ..cache import CACHE_MAGIC, EventsCacheWriter, cache_header, read_cache
+from ..parse_mission_log_line import parse_event
+from ..report import MissionReport
+
+
+LINES = ('T:0 AType:15 VER:17\n',
+         'T:10 AType:0 GDate:1942.9.19 GTime:14:0:0 MFile:Multiplayer/Dogfight\\result.msnbin MID: GType:2 '
+         'CNTRS:0:0,101:1,201:2 SETTS:000000000010000100000000110 MODS:0 PRESET:0 AQMID:0 ROUNDS: 1 POINTS: 15000\n',
+         'T:20 AType:12 ID:107519 TYPE:La-5 ser.8 COUNTRY:101 NAME:La-5 ser.8 PID:-1\n',
+         'T:30 AType:17 ID:107519 POS(39013.016,45.535,16807.107)\n',
+         'T:50 AType:2 DMG:0.030 AID:-1 TID:107519 POS(39013.016,45.535,16807.107)\n')
+
+
+@pytest.fixture
+def path(tmpdir):
+    return pathlib.Path(str(tmpdir))
+
+
+def test_cache(mission, path):
+    """
+    :type mission: MissionReport
+    """
+    log = path.joinpath('missionReport(2020-01-01_12-00-00)[0].txt')
+    log.write_text(''.join(LINES))
+    cache_path = path.joinpath('2020', 'missionReport(2020-01-01_12-00-00)[0].txt.events')
+    mission.processing(files=[log], cache_path=cache_path)
+
+    replayed = MissionReport(objects=mission.objects)
+    assert replayed.replay(cache_path=cache_path)
+    assert replayed.lines == []
+    assert replayed.tik_last == mission.tik_last == 50
+    assert replayed.countries == mission.countries
+    assert replayed.skipped_lines == mission.skipped_lines
+    assert replayed.objects_id_map[107519].damage == mission.objects_id_map[107519].damage > 0
+
+
+def test_cache_records(path):
+    events = [parse_event(line) for line in LINES]
+    cache_path = path.joinpath('m.events')
+    with EventsCacheWriter(path=cache_path) as cache:
+        cache.write(events=events[:2])
+        cache.write(events=events[2:])
+    records = list(read_cache(path=cache_path))
+    assert records == events
+    assert [type(record) for record in records] == [type(event) for event in events]
+
+
+def test_cache_stale(path):
+    cache_path = path.joinpath('m.events')
+    assert read_cache(path=cache_path) is None
+
+    with EventsCacheWriter(path=cache_path, fields=MissionReport.events_fields) as cache:
+        cache.write(events=[parse_event(LINES[0])])
+    assert read_cache(path=cache_path) is None
+    assert read_cache(path=cache_path, fields=MissionReport.events_fields) is not None
+
+    cache_path.write_bytes(cache_header.pack(CACHE_MAGIC, 0, 0))
+    assert read_cache(path=cache_path) is None
+
+
+def test_cache_failed(path):
+    cache_path = path.joinpath('m.events')
+    with pytest.raises(ZeroDivisionError):
+        with EventsCacheWriter(path=cache_path) as cache:
+            cache.write(events=[parse_event(LINES[0])])
+            1 / 0
+    assert list(path.iterdir()) == []
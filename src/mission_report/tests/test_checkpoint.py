@@ -0,0 +1,78 @@
+import lzma
+import pathlib
+
+from ..benchmark import BASE_DIR
+from ..generator import generate, load_objects, write_chunks
+from ..report import MissionReport
+
+
+def sorties_state(mission):
+    """
+    :type mission: MissionReport
+    """
+    return [(sortie.index, sortie.account_id, sortie.tik_spawn, sortie.tik_end, sortie.ratio,
+             sortie.aircraft_damage, sortie.sortie_status.status,
+             sorted((key, sorted(obj.index for obj in objs)) for key, objs in sortie.killboard.items()),
+             [killer.index for killer in sortie.aircraft.killers] if sortie.aircraft else None)
+            for sortie in mission.sorties]
+
+
+def test_feed_checkpoint(tmpdir):
+    path = pathlib.Path(str(tmpdir))
+    lines = generate(players=10, duration=1800, objects=20, seed=2)
+    files = write_chunks(path=path, lines=lines, chunk=500)
+    objects = load_objects(base_dir=BASE_DIR)
+
+    mission = MissionReport(objects=objects)
+    mission.processing(files=files)
+
+    checkpoint_path = path.joinpath('checkpoint', 'm.checkpoint')
+    assert MissionReport.load_checkpoint(path=checkpoint_path, objects=objects) is None
+    fed = MissionReport(objects=objects)
+    for end in range(1, len(files) + 1, 3):
+        # уже обработанные файлы повторно не обрабатываются
+        processed = len(fed.files_processed)
+        assert fed.feed(files=files[:end]) == end - processed
+        fed.save_checkpoint(path=checkpoint_path)
+        fed = MissionReport.load_checkpoint(path=checkpoint_path, objects=objects)
+        assert fed.objects is objects
+    fed.feed(files=files)
+    assert fed.feed(files=files) == 0
+
+    assert fed.files_processed == [f.name for f in files]
+    assert fed.lines == mission.lines == lines
+    assert fed.tik_last == mission.tik_last
+    assert fed.is_correctly_completed == mission.is_correctly_completed
+    assert fed.skipped_lines == mission.skipped_lines
+    assert len(fed.log_entries) == len(mission.log_entries)
+    assert sorties_state(fed) == sorties_state(mission)
+
+
+def test_checkpoint_stale(mission, tmpdir):
+    checkpoint_path = pathlib.Path(str(tmpdir)).joinpath('m.checkpoint')
+    mission.save_checkpoint(path=checkpoint_path)
+    assert MissionReport.load_checkpoint(path=checkpoint_path, objects=mission.objects).countries == mission.countries
+
+    checkpoint_path.write_bytes(checkpoint_path.read_bytes()[:100])
+    assert MissionReport.load_checkpoint(path=checkpoint_path, objects=mission.objects) is None
+
+
+def test_feed_backup(tmpdir):
+    path = pathlib.Path(str(tmpdir))
+    lines = generate(players=5, duration=900, objects=10, seed=3)
+    files = write_chunks(path=path, lines=lines, chunk=500)
+    objects = load_objects(base_dir=BASE_DIR)
+    backup_path = path.joinpath('backup', 'm.txt.xz')
+    checkpoint_path = path.joinpath('m.checkpoint')
+
+    fed = MissionReport(objects=objects, backup_path=backup_path)
+    fed.feed(files=files[:2])
+    assert fed.lines == []
+    fed.save_checkpoint(path=checkpoint_path)
+    # после сохранения состояния обработаны еще файлы, но процесс завершился до следующего сохранения
+    fed.feed(files=files[2:4])
+    fed = MissionReport.load_checkpoint(path=checkpoint_path, objects=objects)
+    fed.feed(files=files)
+
+    with lzma.open(str(backup_path), 'rt') as f:
+        assert f.read() == ''.join(lines)
@@ -0,0 +1,122 @@
+import inspect
+import pathlib
+
+import pytest
+
+from ..benchmark import BASE_DIR, SAMPLE_LINES
+from ..events import events_types
+from ..generator import generate, load_objects
+from ..parse_mission_log_line import atype_params, events_parsers, get_events_parser, parsers
+from ..report import MissionReport
+
+
+def test_events_fields():
+    for atype_id, event_type in enumerate(events_types):
+        assert event_type.atype_id == atype_id
+        assert event_type._fields == atype_params[atype_id]
+
+
+def test_events_handlers(mission):
+    """
+    :type mission: MissionReport
+    """
+    # обработчики получают поля записи позиционно
+    assert len(mission.events_handlers) == len(events_types)
+    for event_type, (handler, before, after) in zip(events_types, mission.events_handlers):
+        assert tuple(inspect.signature(handler).parameters) == event_type._fields
+
+
+def test_events_dispatch():
+    for event_type, (handler, before, after) in zip(events_types, MissionReport.events_dispatch):
+        fields = MissionReport.events_fields.get(event_type.atype_id, event_type._fields)
+        objects_fields = [field for field in event_type.objects_fields if field in fields]
+        # хуки объектов события - только если поля объектов разбираются
+        assert ('update_last_tik' in after) == bool(objects_fields)
+        assert ('update_last_pos' in before) == bool(objects_fields and 'pos' in fields)
+        assert set(before + after) <= {'update_last_pos', 'update_ratio', 'update_last_tik'}
+
+
+def test_events_profile():
+    objects = load_objects(base_dir=BASE_DIR)
+    lines = generate(players=5, duration=600, objects=10, seed=4)
+    mission = MissionReport(objects=objects)
+    mission.apply_records(records=[events_parsers['tokenizer'](line) for line in lines])
+    profiled = MissionReport(objects=objects, profile=True)
+    profiled.apply_records(records=[events_parsers['tokenizer'](line) for line in lines])
+
+    assert profiled.handlers_calls['event_hit'] == sum(1 for line in lines if 'AType:1 ' in line)
+    assert profiled.handlers_calls['update_last_tik'] == sum(
+        profiled.handlers_calls[handler] for handler, before, after in MissionReport.events_dispatch if after)
+    assert set(profiled.handlers_time) == set(profiled.handlers_calls)
+    assert not mission.handlers_calls
+    assert [sortie.tik_last for sortie in profiled.sorties] == [sortie.tik_last for sortie in mission.sorties]
+
+
+@pytest.mark.parametrize('line', [line.format(tik=1) for line in SAMPLE_LINES])
+def test_parse_event(line):
+    data = parsers['regex'](line)
+    atype_id = data.pop('atype_id')
+    for parse_event in events_parsers.values():
+        event = parse_event(line)
+        assert event.atype_id == atype_id
+        assert event._asdict() == data
+
+
+@pytest.mark.parametrize('line', [line.format(tik=1) for line in SAMPLE_LINES])
+def test_parse_event_fields(line):
+    event = events_parsers['tokenizer'](line)
+    fields = MissionReport.events_fields.get(event.atype_id, event._fields)
+    skipped_event = get_events_parser('tokenizer', fields=MissionReport.events_fields)(line)
+    assert type(skipped_event) is type(event)
+    for name in event._fields:
+        assert getattr(skipped_event, name) == (getattr(event, name) if name in fields else None)
+
+
+def test_skipped_lines(mission, tmpdir):
+    """
+    :type mission: MissionReport
+    """
+    log = pathlib.Path(str(tmpdir)).joinpath('missionReport(2020-01-01_12-00-00)[0].txt')
+    log.write_text('T:10 AType:15 VER:17\n'
+                   'T:20 AType:17 ID:107519 POS(39013.016,45.535,16807.107)\n'
+                   'T:30 AType:17 ID:107519 POS(-1.#QO,-1.#QO,-1.#QO)\n'
+                   'T:40 AType:1 AMMO:BULLET_GER_792x57_SS AID:138247 TID:59392\n')
+    mission.objects['bullet_ger_792x57_ss'] = {'cls': 'bullet'}
+    mission.processing(files=[log])
+    assert mission.tik_last == 40
+    assert mission.skipped_lines == {15: 1, 17: 2}
+
+
+def test_processing_workers(mission, tmpdir):
+    """
+    :type mission: MissionReport
+    """
+    path = pathlib.Path(str(tmpdir))
+    files = [path.joinpath('missionReport(2020-01-01_12-00-00)[0].txt'),
+             path.joinpath('missionReport(2020-01-01_12-00-00)[1].txt')]
+    files[0].write_text('T:10 AType:15 VER:17\n'
+                        'T:20 AType:12 ID:107519 TYPE:La-5 ser.8 COUNTRY:101 NAME:La-5 ser.8 PID:-1\n'
+                        'bad line\n')
+    files[1].write_text('T:30 AType:17 ID:107519 POS(39013.016,45.535,16807.107)\n'
+                        'T:40 AType:99 ID:107519\n'
+                        'T:50 AType:2 DMG:0.030 AID:-1 TID:107519 POS(39013.016,45.535,16807.107)\n')
+    mission.processing(files=files)
+
+    mission_workers = MissionReport(objects=mission.objects, workers=2)
+    mission_workers.countries = mission.countries
+    mission_workers.processing(files=files)
+
+    assert mission_workers.lines == mission.lines
+    assert mission_workers.tik_last == mission.tik_last == 50
+    assert mission_workers.skipped_lines == mission.skipped_lines
+    assert mission_workers.objects_id_map[107519].damage == mission.objects_id_map[107519].damage > 0
+
+
+def test_parse_event_symbols():
+    symbols = {}
+    parse_event = get_events_parser('tokenizer', symbols=symbols)
+    line = 'T:{} AType:1 AMMO:BULLET_GER_792x57_SS AID:138247 TID:59392'
+    first, second = parse_event(line.format(1)), parse_event(line.format(2))
+    assert first.ammo == second.ammo == 'BULLET_GER_792x57_SS'
+    assert first.ammo is second.ammo
+    assert symbols == {'BULLET_GER_792x57_SS': 'BULLET_GER_792x57_SS'}
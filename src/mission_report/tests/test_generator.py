@@ -0,0 +1,56 @@
+import pathlib
+
+import pytest
+
+from ..benchmark import BASE_DIR
+from ..generator import generate, load_objects, write_chunks
+from ..parse_mission_log_line import parse_event
+from ..report import MissionReport
+
+
+def test_generate(tmpdir):
+    lines = generate(players=10, duration=1800, objects=20, seed=1)
+    events = [parse_event(line) for line in lines]
+    assert {event.atype_id for event in events} == set(range(23))
+    assert [event.tik for event in events] == sorted(event.tik for event in events)
+    assert generate(players=10, duration=1800, objects=20, seed=1) == lines
+
+    files = write_chunks(path=pathlib.Path(str(tmpdir)), lines=lines, chunk=1000)
+    assert len(files) == (len(lines) + 999) // 1000
+    assert files[1].name == 'missionReport(2020-01-01_12-00-00)[1].txt'
+
+    mission = MissionReport(objects=load_objects(base_dir=BASE_DIR))
+    mission.processing(files=files)
+    assert mission.lines == lines
+    assert mission.is_correctly_completed
+    assert mission.sorties
+    assert any(sortie.is_ended for sortie in mission.sorties)
+    assert any(sortie.killboard for sortie in mission.sorties)
+
+
+def test_generate_short_mission(tmpdir):
+    lines = generate(players=10, duration=600, objects=10, seed=1)
+    events = [parse_event(line) for line in lines]
+    spawns = {event.aircraft_id for event in events if event.atype_id == 10}
+    assert spawns
+    # все вылеты завершаются до конца миссии
+    assert {event.aircraft_id for event in events if event.atype_id == 4} == spawns
+    assert events[-1].atype_id == 7
+
+    mission = MissionReport(objects=load_objects(base_dir=BASE_DIR))
+    mission.processing(files=write_chunks(path=pathlib.Path(str(tmpdir)), lines=lines))
+    assert mission.sorties
+    assert all(sortie.is_ended for sortie in mission.sorties)
+
+
+def test_generate_mix():
+    def count(lines, atype_id):
+        return sum(1 for line in lines if ' AType:{} '.format(atype_id) in line)
+
+    lines = generate(players=10, duration=1200, objects=10, seed=1)
+    more_pos = generate(players=10, duration=1200, objects=10, mix={17: 2}, seed=1)
+    assert count(more_pos, 17) > count(lines, 17) * 1.5
+    no_attacks = generate(players=10, duration=1200, objects=10, mix={2: 0}, seed=1)
+    assert count(no_attacks, 1) == count(no_attacks, 2) == count(no_attacks, 3) == 0
+    with pytest.raises(ValueError):
+        generate(mix={5: 1})
@@ -9,6 +9,10 @@ def test_point_in_polygon():
     polygon_square = [[0, 0], [15000, 0], [15000, 5000], [15000, 15000], [5000, 15000], [5000, 10000],
                       [10000, 10000], [10000, 5000], [5000, 5000], [5000, 15000], [0, 15000]]
     assert not point_in_polygon(point=point, polygon=polygon_square)
+    # вершины с высотой, как в логе
+    polygon_square = [[0, 74.3, 0], [15000, 74.3, 0], [15000, 74.3, 15000], [0, 74.3, 15000]]
+    assert point_in_polygon(point=point, polygon=polygon_square)
+    assert not point_in_polygon(point={'x': 7500.0, 'y': 0.0, 'z': 17500.0}, polygon=polygon_square)
 
 
 def test_distance():
@@ -0,0 +1,47 @@
+from ..log_entries import FRIENDLY_FIRE, KILLED, RTB, LogEntries
+from ..report import Object
+from ..statuses import LifeStatus
+
+
+def test_log_entries(mission):
+    """
+    :type mission: MissionReport
+    """
+    aircraft = Object(mission=mission, object_id=10011, object_name='La-5 ser.8', country_id=101, coal_id=1,
+                      parent_id=None)
+    target = Object(mission=mission, object_id=10021, object_name='La-5 ser.8', country_id=201, coal_id=2,
+                    parent_id=None)
+    pos = {'x': 1.5, 'y': 2.0, 'z': -3.25}
+    entries = LogEntries()
+    entries.append('takeoff', 10, actor=aircraft, pos=pos)
+    entries.append('damage', 20, actor=aircraft, target=target, damage=12.5, flags=FRIENDLY_FIRE)
+    entries.append('kill', 30, target=target, pos=pos)
+    entries.append('landed', 40, actor=aircraft, flags=RTB | KILLED, status=LifeStatus.destroyed)
+    assert len(entries) == 4
+    # объект хранится в списке один раз
+    assert entries.refs == [aircraft, target]
+    assert list(entries) == [
+        ('takeoff', 10, aircraft, None, 0.0, 0, pos),
+        ('damage', 20, aircraft, target, 12.5, FRIENDLY_FIRE, None),
+        ('kill', 30, None, target, 0.0, 0, pos),
+        ('landed', 40, aircraft, None, 0.0, RTB | KILLED | (3 << LogEntries.status_shift), None),
+    ]
+    assert LogEntries.get_status(list(entries)[3][5]) == LifeStatus.destroyed
+    assert LogEntries.get_status(0) is None
+
+
+def test_logger_event(mission):
+    """
+    :type mission: MissionReport
+    """
+    aircraft = Object(mission=mission, object_id=10011, object_name='La-5 ser.8', country_id=101, coal_id=1,
+                      parent_id=None)
+    target = Object(mission=mission, object_id=10021, object_name='La-5 ser.8', country_id=101, coal_id=1,
+                    parent_id=None)
+    mission.tik_last = 100
+    target.got_damaged(damage=60, attacker=aircraft)
+    target.got_killed(attacker=aircraft)
+    assert [entry[:6] for entry in mission.log_entries] == [
+        ('damage', 100, aircraft, target, 60.0, FRIENDLY_FIRE),
+        ('kill', 100, aircraft, target, 0.0, FRIENDLY_FIRE),
+    ]
@@ -1,3 +1,6 @@
+import operator
+import random
+
 from ..statuses import SortieStatus, BotLifeStatus
 from ..report import Airfield, Area, MissionReport, Object, Sortie
 
@@ -153,6 +156,105 @@ def test_sortie(mission):
     assert sortie.bot_status == BotLifeStatus()
 
 
+def test_current_ratio(mission):
+    """
+    :type mission: MissionReport
+    """
+    class ActiveSortie:
+        def __init__(self, coal_id):
+            self.coal_id = coal_id
+
+    sorties = [ActiveSortie(coal_id=1), ActiveSortie(coal_id=1), ActiveSortie(coal_id=1), ActiveSortie(coal_id=2)]
+    assert mission.get_current_ratio(sortie_coal_id=1) == 1
+    for sortie in sorties + sorties:
+        mission.add_active_sortie(sortie=sortie)
+    assert mission.active_sorties_total == 4
+    assert mission.get_current_ratio(sortie_coal_id=1) == 0.5
+    assert mission.get_current_ratio(sortie_coal_id=2) == 1.5
+    for sortie in sorties[:2] + sorties[:2]:
+        mission.rm_active_sortie(sortie=sortie)
+    assert mission.active_sorties_total == 2
+    assert mission.get_current_ratio(sortie_coal_id=2) == 1
+
+
+def test_object_containers(mission):
+    """
+    :type mission: MissionReport
+    """
+    aircraft = Object(mission=mission, object_id=10011, object_name='La-5 ser.8', country_id=101, coal_id=1,
+                      parent_id=None)
+    target = Object(mission=mission, object_id=10021, object_name='La-5 ser.8', country_id=201, coal_id=2,
+                    parent_id=None)
+    assert not hasattr(aircraft, '__dict__')
+    # словари создаются при первом обращении
+    assert aircraft._damagers is aircraft._killboard is aircraft._assistboard is aircraft._children is None
+
+    target.got_damaged(damage=60, attacker=aircraft)
+    target.got_killed(attacker=aircraft)
+    assert target.damagers == {aircraft: 60}
+    assert aircraft.killboard == {'aircraft_light': {target}}
+    assert aircraft._damagers is None
+    assert aircraft._assistboard is None
+
+    aircraft.captured()
+    aircraft.uncaptured()
+    assert aircraft._children is None
+
+
+def test_top_damagers(mission):
+    """
+    :type mission: MissionReport
+    """
+    rnd = random.Random(0)
+    attackers = [Object(mission=mission, object_id=10100 + i, object_name='La-5 ser.8', country_id=201, coal_id=2,
+                        parent_id=None) for i in range(6)]
+    for target_id in range(10200, 10500):
+        target = Object(mission=mission, object_id=target_id, object_name='La-5 ser.8', country_id=101, coal_id=1,
+                        parent_id=None)
+        target.on_ground = True
+        # целый дамаг - часто равный у разных дамагеров
+        for _ in range(rnd.randint(0, 12)):
+            target.got_damaged(damage=rnd.randint(0, 5), attacker=rnd.choice(attackers))
+        killer = rnd.choice(attackers + [None])
+        # прежняя логика - сортировка всех дамагеров
+        expected = [a[0] for a in sorted(target.damagers.items(), key=operator.itemgetter(1), reverse=True)]
+        assert list(target.top_damagers) == expected[:2]
+        if killer in expected:
+            expected.remove(killer)
+            expected.insert(0, killer)
+
+        target.got_killed(attacker=killer)
+        if killer or expected:
+            assert target.killers == expected
+            assert target in (killer or expected[0]).killboard['aircraft_light']
+        if len(expected) > 1 and target.damagers[expected[1]] > 1:
+            assert target in expected[1].assistboard['aircraft_light']
+
+
+def test_top_damagers_negative(mission):
+    """
+    :type mission: MissionReport
+    """
+    first, second, third = [Object(mission=mission, object_id=10100 + i, object_name='La-5 ser.8', country_id=201,
+                                   coal_id=2, parent_id=None) for i in range(3)]
+    target = Object(mission=mission, object_id=10200, object_name='La-5 ser.8', country_id=101, coal_id=1,
+                    parent_id=None)
+    target.on_ground = True
+    target.got_damaged(damage=50, attacker=first)
+    target.got_damaged(damage=30, attacker=second)
+    target.got_damaged(damage=20, attacker=third)
+    assert target.top_damagers == (first, second)
+    # отрицательный дамаг опускает дамагера ниже третьего
+    target.got_damaged(damage=-40, attacker=first)
+    assert target.top_damagers == (second, third)
+    target.got_damaged(damage=-10, attacker=second)
+    # при равном дамаге первым идет дамагер раньше попавший в damagers
+    assert target.top_damagers == (second, third)
+    target.got_killed(force_by_dmg=True)
+    assert target.killers == [second, third, first]
+    assert target in second.killboard['aircraft_light']
+
+
 
 # def test_aircraft(mission, airfield_friendly, area_friendly, area_enemy):
 #     """
@@ -0,0 +1,102 @@
+import math
+import random
+
+from ..helpers import point_in_polygon
+from ..report import Airfield, Area
+from ..spatial import AirfieldsIndex, AreasIndex, Polygon
+
+
+def random_polygon(rnd, center_x, center_z, vertices):
+    """ звездообразный многоугольник с вершинами (x, y, z) """
+    boundary = []
+    for i in range(vertices):
+        angle = 2 * math.pi * i / vertices
+        radius = rnd.uniform(5000, 30000)
+        boundary.append((round(center_x + radius * math.cos(angle), 1), 74.3,
+                         round(center_z + radius * math.sin(angle), 1)))
+    return boundary
+
+
+def test_polygon():
+    rnd = random.Random(0)
+    for _ in range(20):
+        boundary = random_polygon(rnd, center_x=rnd.uniform(0, 100000), center_z=rnd.uniform(0, 100000),
+                                  vertices=rnd.randint(3, 60))
+        polygon = Polygon(boundary)
+        for _ in range(500):
+            pos = {'x': rnd.uniform(-40000, 140000), 'y': 0.0, 'z': rnd.uniform(-40000, 140000)}
+            assert polygon.contains(x=pos['x'], z=pos['z']) == point_in_polygon(point=pos, polygon=boundary)
+        # точки на вершинах и ребрах
+        for x, y, z in boundary:
+            pos = {'x': x, 'y': 0.0, 'z': z}
+            assert polygon.contains(x=x, z=z) == point_in_polygon(point=pos, polygon=boundary)
+
+
+def test_polygon_degenerate():
+    assert not Polygon([(0.0, 0.0), (10.0, 0.0)]).contains(x=5.0, z=0.0)
+    assert not Polygon([(0.0, 0.0)]).contains(x=0.0, z=0.0)
+
+
+def test_areas_index():
+    rnd = random.Random(1)
+    areas = []
+    for area_id in range(10):
+        area = Area(area_id=area_id, country_id=101, coal_id=rnd.choice((0, 1, 2)), enabled=True, in_air=[0] * 8)
+        area.boundary = random_polygon(rnd, center_x=rnd.uniform(0, 100000), center_z=rnd.uniform(0, 100000),
+                                       vertices=rnd.randint(3, 30))
+        areas.append(area)
+    index = AreasIndex(areas=areas)
+    for _ in range(2000):
+        pos = {'x': rnd.uniform(-40000, 140000), 'y': 0.0, 'z': rnd.uniform(-40000, 140000)}
+        expected = [area for area in areas if area.coal_id not in (0, 1) and area.is_inside(pos=pos)]
+        assert sorted(area.id for area in index.find(pos=pos, exclude_coals=(0, 1))) == [a.id for a in expected]
+    assert list(AreasIndex(areas=[]).find(pos={'x': 1.0, 'y': 0.0, 'z': 1.0})) == []
+
+
+def test_areas_index_invalidation(mission):
+    mission.event_influence_area(tik=0, area_id=1, country_id=201, enabled=True, in_air=[0] * 8)
+    mission.event_influence_area_boundary(tik=1, area_id=1, boundary=((0.0, 74.3, 0.0), (50000.0, 74.3, 0.0),
+                                                                      (50000.0, 74.3, 50000.0), (0.0, 74.3, 50000.0)))
+    pos = {'x': 25000.0, 'y': 0.0, 'z': 25000.0}
+    assert [area.id for area in mission.find_areas(pos=pos, exclude_coals=(0, 1))] == [1]
+    index = mission.areas_index
+    # изменение количества самолетов в зоне не сбрасывает индекс
+    mission.event_influence_area(tik=2, area_id=1, country_id=201, enabled=True, in_air=[1] + [0] * 7)
+    assert mission.areas_index is index
+    mission.event_influence_area(tik=3, area_id=1, country_id=201, enabled=False, in_air=[0] * 8)
+    assert mission.areas_index is None
+    assert list(mission.find_areas(pos=pos, exclude_coals=(0, 1))) == []
+    mission.event_influence_area(tik=4, area_id=1, country_id=101, enabled=True, in_air=[0] * 8)
+    assert list(mission.find_areas(pos=pos, exclude_coals=(0, 1))) == []
+    assert [area.id for area in mission.find_areas(pos=pos, exclude_coals=(0, 2))] == [1]
+
+
+def test_airfields_index():
+    rnd = random.Random(2)
+    index = AirfieldsIndex(radius=Airfield.radius)
+    airfields = []
+    for airfield_id in range(300):
+        pos = {'x': rnd.uniform(0, 300000), 'y': 50.0, 'z': rnd.uniform(0, 300000)}
+        airfield = Airfield(airfield_id=airfield_id, country_id=101, coal_id=rnd.choice((1, 2)), pos=pos)
+        index.add(airfield)
+        airfields.append(airfield)
+    for _ in range(2000):
+        airfield = rnd.choice(airfields)
+        pos = {'x': airfield.pos['x'] + rnd.uniform(-6000, 6000), 'y': 0.0,
+               'z': airfield.pos['z'] + rnd.uniform(-6000, 6000)}
+        expected = [af.id for af in airfields if af.coal_id == 1 and af.on_airfield(pos=pos)]
+        assert sorted(af.id for af in index.find(pos=pos, coal_id=1)) == expected
+    assert list(index.find(pos={'x': 0.0, 'y': 0.0, 'z': 0.0}, coal_id=1)) == []
+
+
+def test_airfields_index_update(mission):
+    pos = {'x': 7500.0, 'y': 0.0, 'z': 7500.0}
+    mission.event_airfield(tik=0, airfield_id=1, country_id=101, pos=pos, aircraft_id_list=[])
+    mission.event_airfield(tik=0, airfield_id=2, country_id=101, pos={'x': 0.0, 'y': 0.0, 'z': 0.0},
+                           aircraft_id_list=[])
+    near = {'x': 8000.0, 'y': 0.0, 'z': 8000.0}
+    assert [af.id for af in mission.airfields_index.find(pos=near, coal_id=1)] == [1]
+    # аэродром захвачен другой коалицией
+    mission.event_airfield(tik=10, airfield_id=1, country_id=201, pos=pos, aircraft_id_list=[])
+    assert list(mission.airfields_index.find(pos=near, coal_id=1)) == []
+    assert [af.id for af in mission.airfields_index.find(pos=near, coal_id=2)] == [1]
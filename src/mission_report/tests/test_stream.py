@@ -0,0 +1,75 @@
+from collections import Counter
+import pathlib
+
+import pytest
+
+from ..parse_mission_log_line import UnexpectedATypeWarning, parse_event
+from ..stream import iter_events, read_events, reorder_events
+
+
+LOG = ('T:0 AType:15 VER:17\n'
+       'bad line\n'
+       'T:10 AType:20 USERID:00000000-0000-0000-0000-000000000001 USERNICKID:00000000-0000-0000-0000-000000000002\n'
+       'T:20 AType:17 ID:107519 POS(39013.016,45.535,16807.107)\n'
+       'T:30 AType:2 DMG:0.030 AID:172089\n'
+       'T:40 AType:99 ID:107519\n'
+       'T:50 AType:21 USERID:00000000-0000-0000-0000-000000000001 USERNICKID:00000000-0000-0000-0000-000000000002\n')
+
+
+@pytest.fixture
+def log(tmpdir):
+    path = pathlib.Path(str(tmpdir)).joinpath('missionReport(2020-01-01_12-00-00)[0].txt')
+    path.write_text(LOG)
+    return path
+
+
+def test_read_events(log):
+    events = list(read_events(file_path=log))
+    assert [line for line, event in events] == LOG.splitlines(keepends=True)
+    assert events[1][1] is None
+    assert isinstance(events[4][1], ValueError)
+    assert isinstance(events[5][1], UnexpectedATypeWarning)
+    assert [event.tik for line, event in events if isinstance(event, tuple)] == [0, 10, 20, 50]
+
+
+def test_read_events_atypes(log):
+    parsed = []
+
+    def parse(line):
+        parsed.append(line)
+        return parse_event(line)
+
+    events = list(read_events(file_path=log, parse=parse, atypes=(20, 21)))
+    # строки остальных событий не разбираются
+    assert parsed == [LOG.splitlines(keepends=True)[i] for i in (2, 6)]
+    assert [event.atype_id for line, event in events if event is not None] == [20, 21]
+
+
+@pytest.mark.parametrize('parser', ['regex', 'tokenizer'])
+def test_iter_events(log, parser):
+    events = list(iter_events(files=[log, log], parser=parser))
+    assert [event.atype_id for event in events] == [15, 20, 17, 21] * 2
+    events = list(iter_events(files=[log], atypes=(20, 21), parser=parser))
+    assert [(event.tik, event.account_id) for event in events] == [
+        (10, '00000000-0000-0000-0000-000000000001'), (50, '00000000-0000-0000-0000-000000000001')]
+
+
+def test_reorder_events():
+    lines = ['T:10 AType:20 USERID:00000000-0000-0000-0000-000000000001 USERNICKID:00000000-0000-0000-0000-000000000002',
+             'T:30 AType:1 AMMO:BULLET_GER_792x57_SS AID:104447 TID:105471',
+             'T:30 AType:1 AMMO:BULLET_GER_792x57_SS AID:104447 TID:105471',
+             'T:20 AType:17 ID:107519 POS(39013.016,45.535,16807.107)',
+             'T:20 AType:17 ID:107519 POS(39013.016,45.535,16807.107)',
+             'T:30 AType:19',
+             'T:30 AType:7',
+             'T:30 AType:19',
+             'T:40 AType:21 USERID:00000000-0000-0000-0000-000000000001 USERNICKID:00000000-0000-0000-0000-000000000002',
+             'T:5 AType:19']
+    events = [parse_event(line) for line in lines]
+    counters = Counter()
+    result = list(reorder_events(events=events, window=4, counters=counters, repeatable_atypes=(1,)))
+    # попадания повторяются законно, у разных событий (7 и 19) одинаковые поля,
+    # событие опоздавшее больше чем на окно не переставляется
+    assert [(event.tik, event.atype_id) for event in result] == [
+        (10, 20), (20, 17), (30, 1), (5, 19), (30, 1), (30, 19), (30, 7), (40, 21)]
+    assert counters == {'reordered': 1, 'duplicate': 2, 'late': 1}
@@ -1,12 +1,10 @@
-import logging
 import re
 import time
 
-from mission_report import parse_mission_log_line
-from stats.models import CurrentMission
-
+from django.conf import settings
 
-logger = logging.getLogger('current_mission')
+from mission_report.stream import iter_events
+from stats.models import CurrentMission
 
 
 def update_current_mission(m_report_files):
@@ -19,24 +17,14 @@ def update_current_mission(m_report_files):
         duration = time.time() - m_report_files[0].stat().st_mtime
         CurrentMission.objects.update(duration=duration);
     else:
-        for line in m_report_files[0].open():
-            if 'AType' not in line:
-                logger.warning('ignored bad string: [{}]'.format(line))
-                continue
-            try:
-                data = parse_mission_log_line.parse(line)
-            except parse_mission_log_line.UnexpectedATypeWarning:
-                logger.warning('unexpected atype: [{}]'.format(line))
-                continue
-
-            atype_id = data.pop('atype_id')
-
-            if atype_id == 0:
-                mission = 'Unknown'
-                m = re.match(r".+\\(?P<mission>.+)[-_]WL[-_]\w+[-_].*", data['file_path'], re.IGNORECASE)
-                if m:
-                    mission = m.group('mission')
-                CurrentMission.objects.update_or_create(name=mission, duration=0)
+        # нужно только событие начала миссии (AType 0) в начале первого файла
+        for event in iter_events(files=m_report_files[:1], atypes=(0,), parser=settings.MISSION_REPORT_PARSER):
+            mission = 'Unknown'
+            m = re.match(r".+\\(?P<mission>.+)[-_]WL[-_]\w+[-_].*", event.file_path, re.IGNORECASE)
+            if m:
+                mission = m.group('mission')
+            CurrentMission.objects.update_or_create(name=mission, duration=0)
+            break
 
 
 def cleanup_current_mission():
@@ -0,0 +1,46 @@
+import pathlib
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from mission_report import generator
+from stats import stats_whore
+
+
+class Command(BaseCommand):
+    help = ('End-to-end stats_whore benchmark on a generated mission log. '
+            'Requires imported game objects (import_csv_data), all database changes are rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--players', type=int, default=50)
+        parser.add_argument('--duration', type=int, default=7200, help='mission duration in seconds')
+        parser.add_argument('--objects', type=int, default=500, help='number of ground objects')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        lines = generator.generate(players=options['players'], duration=options['duration'],
+                                   objects=options['objects'], seed=options['seed'])
+        path = pathlib.Path(tempfile.mkdtemp(prefix='stats_benchmark_'))
+        name = 'missionReport({})'.format(time.strftime('%Y-%m-%d_%H-%M-%S'))
+        files = generator.write_chunks(path=path, lines=lines, name=name)
+
+        # лог и архив лога во временном каталоге
+        report_path, backup_path = stats_whore.MISSION_REPORT_PATH, stats_whore.MISSION_REPORT_BACKUP_PATH
+        stats_whore.MISSION_REPORT_PATH, stats_whore.MISSION_REPORT_BACKUP_PATH = path, path.joinpath('backup')
+        try:
+            with transaction.atomic(), CaptureQueriesContext(connection) as queries:
+                time_start = time.perf_counter()
+                stats_whore.stats_whore(m_report_file=files[0])
+                seconds = time.perf_counter() - time_start
+                transaction.set_rollback(True)
+        finally:
+            stats_whore.MISSION_REPORT_PATH, stats_whore.MISSION_REPORT_BACKUP_PATH = report_path, backup_path
+            shutil.rmtree(str(path))
+
+        self.stdout.write('stats_whore: {lines} lines in {files} files, {seconds:.2f} sec, {speed:,.0f} lines/sec, '
+                          '{queries} queries'.format(lines=len(lines), files=len(files), seconds=seconds,
+                                                     speed=len(lines) / seconds, queries=len(queries)))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from stats.sql import get_ratio_backfill_sql
+
+
+class Command(BaseCommand):
+    help = ('Recalculate ratio sum and count of players, missions, aircraft and vlifes stats from existing sorties. '
+            'The initial fill is done by migration 0034, the command is only needed to repair the counters.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic(), connection.cursor() as cursor:
+            for table, sql in get_ratio_backfill_sql():
+                cursor.execute(sql)
+                self.stdout.write('{table}: {count} rows updated'.format(table=table, count=cursor.rowcount))
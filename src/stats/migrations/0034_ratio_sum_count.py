@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.25 on 2026-10-17 12:00
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+from stats.sql import get_ratio_backfill_sql
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stats', '0033_award_order_field'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='player',
+            name='ratio_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='player',
+            name='ratio_sum',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='playeraircraft',
+            name='ratio_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='playeraircraft',
+            name='ratio_sum',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='playermission',
+            name='ratio_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='playermission',
+            name='ratio_sum',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='vlife',
+            name='ratio_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='vlife',
+            name='ratio_sum',
+            field=models.FloatField(default=0),
+        ),
+        # заполнение по существующим вылетам, повторно можно выполнить командой stats_ratio
+        migrations.RunSQL(
+            [sql for _, sql in get_ratio_backfill_sql()],
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -6,7 +6,7 @@ from django.conf import settings
 from django.contrib.postgres.fields import ArrayField, JSONField
 from django.templatetags.static import static
 from django.db import connection, models
-from django.db.models import Avg, Count, Sum, Max
+from django.db.models import Count, Sum
 from django.urls import reverse, reverse_lazy
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _, pgettext_lazy
@@ -17,7 +17,7 @@ from mission_report.statuses import BotLifeStatus, SortieStatus, LifeStatus, VLi
 from .aircraft_mods import get_aircraft_mods
 from .aircraft_payloads import get_aircraft_payload
 from .models_managers import PlayerManager, SquadManager, VLifeManager
-from .sql import get_position_by_field, get_squad_position_by_field
+from .sql import get_position_by_field, get_positions_by_field, get_squad_position_by_field
 
 
 def default_coal_list():
@@ -404,6 +404,9 @@ class Player(models.Model):
     score = models.BigIntegerField(default=0, db_index=True)
     rating = models.BigIntegerField(default=0, db_index=True)
     ratio = models.FloatField(default=1)
+    # сумма и количество коэффициентов вылетов - ratio считается без запроса к вылетам
+    ratio_sum = models.FloatField(default=0)
+    ratio_count = models.IntegerField(default=0)
     rank = models.ForeignKey(Rank, default=0)
 
     sorties_total = models.IntegerField(default=0)
@@ -587,9 +590,8 @@ class Player(models.Model):
         self.rating = int((sd * shr * self.score) / 1000)
 
     def update_ratio(self):
-        ratio = Sortie.objects.filter(player_id=self.id).aggregate(ratio=Avg('ratio'))['ratio']
-        if ratio:
-            self.ratio = round(ratio, 2)
+        if self.ratio_count:
+            self.ratio = round(self.ratio_sum / self.ratio_count, 2)
 
     # Крылья Онлайн: coal_pref - 100% вылетов за сторону
     def update_coal_pref(self):
@@ -616,52 +618,7 @@ class Player(models.Model):
 
     # Крылья Онлайн: присвоение звания
     def calculate_rank(self):
-        if self.coal_pref > 0:
-            rank_id = Rank.objects.filter(min_flight_hours__lte=self.flight_time_hours,
-                                          min_rating__lte=self.rating,
-                                          min_rating_position__gt=self.get_position_by_field(field='rating')).aggregate(
-                Max('id'))['id__max']
-
-            if rank_id == 11 and not self.is_general():
-                rank_id = rank_id - 1
-
-            return Rank.objects.filter(id=rank_id)[0]
-        else:
-            return Rank.objects.filter(id=0)[0]
-
-    # Крылья Онлайн: генералы
-    def is_general(self):
-        AIRCRAFT_TYPE = ['aircraft_heavy', 'aircraft_medium', 'aircraft_light']
-
-        sql_general = """select *
-                         from Players
-                         where rating = (select max(rating)
-                                         from (select pl.rating, pl.sorties_cls 
-                                               from Players pl
-                                                 join Profiles pr on pl.profile_id = pr.id
-                                               where pl.coal_pref = {coal_pref}
-                                                 and pl.tour_id = {tour}
-                                                 and pl.flight_time >= {min_flight_hours}
-                                                 and is_hide = false) as t
-                                         where cast(cast(t.sorties_cls::json->'{fav_aircraft_type}' as text) as int) >= cast(cast(t.sorties_cls::json->'{type0}' as text) as int)
-                                           and cast(cast(t.sorties_cls::json->'{fav_aircraft_type}' as text) as int) >= cast(cast(t.sorties_cls::json->'{type1}' as text) as int))"""
-
-        fav_aircraft_type = self.get_fav_aircraft_type()
-        types = AIRCRAFT_TYPE[:]
-        types.remove(fav_aircraft_type)
-
-        rank = Rank.objects.filter(id=11)[0]
-        try:
-            general = Player.objects.raw(sql_general.format(coal_pref=self.coal_pref,
-                                                            tour=self.tour_id,
-                                                            fav_aircraft_type=fav_aircraft_type,
-                                                            min_flight_hours=rank.min_flight_hours * 3600,
-                                                            type0=types[0],
-                                                            type1=types[1]))[0]
-
-            return self.id == general.id
-        except IndexError:
-            return False
+        return calculate_ranks(tour=self.tour, players=[self])[self.id]
 
     # Крылья Онлайн: пилот с лучшим стриком
     def is_top_streak(self):
@@ -754,6 +711,78 @@ class Player(models.Model):
                 or self.is_rewarded('knights_cross_leaves_swords_diamonds_gold_ground'))
 
 
+# Крылья Онлайн: типы самолетов генералов
+GENERAL_AIRCRAFT_TYPES = ('aircraft_heavy', 'aircraft_medium', 'aircraft_light')
+
+
+# Крылья Онлайн: звания пилотов тура
+def calculate_ranks(tour, players):
+    """ позиции в рейтинге считаются одним запросом на тип игроков, генералы - одним запросом на все коалиции
+
+    :type tour: Tour
+    :type players: collections.Iterable[Player]
+    :rtype: dict[int, Rank]
+    """
+    ranks = {rank.id: rank for rank in Rank.objects.all()}
+    positions = {}
+    generals = None
+    players_ranks = {}
+    for player in players:
+        rank_id = 0
+        if player.coal_pref > 0:
+            if player.type not in positions:
+                positions[player.type] = get_positions_by_field(tour=tour, field='rating', player_type=player.type)
+            position = positions[player.type].get(player.id, 0)
+            rank_id = max((rank.id for rank in ranks.values()
+                           if rank.min_flight_hours <= player.flight_time_hours and rank.min_rating <= player.rating
+                           and rank.min_rating_position > position), default=0)
+            if rank_id == 11:
+                if generals is None:
+                    generals = get_generals(tour=tour, rank=ranks[11])
+                if generals.get((player.coal_pref, player.get_fav_aircraft_type())) != player.id:
+                    rank_id = 10
+        players_ranks[player.id] = ranks[rank_id]
+    return players_ranks
+
+
+# Крылья Онлайн: генералы
+def get_generals(tour, rank):
+    """ генерал - игрок коалиции с наибольшим рейтингом среди летающих в основном на том же типе самолетов
+
+    :type tour: Tour
+    :type rank: Rank
+    :rtype: dict[(int, str), int]
+    """
+    candidates = (Player.objects
+                  .filter(tour_id=tour.id, coal_pref__gt=0, flight_time__gte=rank.min_flight_hours * 3600,
+                          profile__is_hide=False)
+                  .order_by('id')
+                  .values_list('id', 'coal_pref', 'rating', 'sorties_cls'))
+    return select_generals(candidates)
+
+
+def select_generals(candidates):
+    """ тип самолетов подходит игроку если вылетов на нем не меньше чем на других типах генералов,
+    без вылетов на каком-либо из типов (нет ключа в sorties_cls) игрок не подходит ни для одного типа,
+    при равном рейтинге генералом становится первый из candidates
+
+    :param candidates: (id, коалиция, рейтинг, sorties_cls) игроков
+    :type candidates: collections.Iterable[tuple]
+    :rtype: dict[(int, str), int]
+    """
+    generals = {}
+    for player_id, coal_pref, rating, sorties_cls in candidates:
+        for aircraft_type in GENERAL_AIRCRAFT_TYPES:
+            count = sorties_cls.get(aircraft_type)
+            if count is None or any(sorties_cls.get(other) is None or count < sorties_cls[other]
+                                    for other in GENERAL_AIRCRAFT_TYPES if other != aircraft_type):
+                continue
+            key = (coal_pref, aircraft_type)
+            if key not in generals or rating > generals[key][0]:
+                generals[key] = (rating, player_id)
+    return {key: player_id for key, (rating, player_id) in generals.items()}
+
+
 class PlayerMission(models.Model):
     profile = models.ForeignKey(Profile, related_name='+', on_delete=models.CASCADE)
     player = models.ForeignKey(Player, related_name='+', on_delete=models.CASCADE)
@@ -761,6 +790,8 @@ class PlayerMission(models.Model):
 
     score = models.IntegerField(default=0, db_index=True)
     ratio = models.FloatField(default=1)
+    ratio_sum = models.FloatField(default=0)
+    ratio_count = models.IntegerField(default=0)
 
     sorties_total = models.IntegerField(default=0)
     sorties_coal = ArrayField(models.IntegerField(default=0), default=default_coal_list)
@@ -824,11 +855,14 @@ class PlayerMission(models.Model):
         return self.profile.nickname
 
     def save(self, *args, **kwargs):
+        self.update_stats()
+        super().save(*args, **kwargs)
+
+    def update_stats(self):
         self.update_accuracy()
         self.update_analytics()
         self.update_ratio()
         self.update_coal_pref()
-        super().save(*args, **kwargs)
 
     def get_profile_url(self):
         url = '{url}?tour={tour_id}'.format(url=reverse('stats:pilot', args=[self.profile_id, self.nickname]),
@@ -864,10 +898,8 @@ class PlayerMission(models.Model):
         self.ce = round(self.kl * self.khr / 10, 2)
 
     def update_ratio(self):
-        ratio = (Sortie.objects.filter(player_id=self.id, mission_id=self.mission_id)
-                 .aggregate(ratio=Avg('ratio'))['ratio'])
-        if ratio:
-            self.ratio = round(ratio, 2)
+        if self.ratio_count:
+            self.ratio = round(self.ratio_sum / self.ratio_count, 2)
 
     # Крылья Онлайн: coal_pref - 100% вылетов за сторону
     def update_coal_pref(self):
@@ -895,6 +927,8 @@ class PlayerAircraft(models.Model):
 
     score = models.IntegerField(default=0)
     ratio = models.FloatField(default=1)
+    ratio_sum = models.FloatField(default=0)
+    ratio_count = models.IntegerField(default=0)
 
     sorties_total = models.IntegerField(default=0)
     flight_time = models.BigIntegerField(default=0)
@@ -959,10 +993,13 @@ class PlayerAircraft(models.Model):
         return self.flight_time / 3600
 
     def save(self, *args, **kwargs):
+        self.update_stats()
+        super().save(*args, **kwargs)
+
+    def update_stats(self):
         self.update_accuracy()
         self.update_analytics()
         self.update_ratio()
-        super().save(*args, **kwargs)
 
     def update_accuracy(self):
         if self.ammo['used_cartridges']:
@@ -981,10 +1018,8 @@ class PlayerAircraft(models.Model):
         self.ce = round(self.kl * self.khr / 10, 2)
 
     def update_ratio(self):
-        ratio = (Sortie.objects.filter(player_id=self.id, aircraft_id=self.aircraft_id)
-                 .aggregate(ratio=Avg('ratio'))['ratio'])
-        if ratio:
-            self.ratio = round(ratio, 2)
+        if self.ratio_count:
+            self.ratio = round(self.ratio_sum / self.ratio_count, 2)
 
 
 class VLife(models.Model):
@@ -998,6 +1033,8 @@ class VLife(models.Model):
 
     score = models.IntegerField(default=0, db_index=True)
     ratio = models.FloatField(default=1)
+    ratio_sum = models.FloatField(default=0)
+    ratio_count = models.IntegerField(default=0)
 
     sorties_total = models.IntegerField(default=0, db_index=True)
     sorties_coal = ArrayField(models.IntegerField(default=0), default=default_coal_list)
@@ -1088,11 +1125,14 @@ class VLife(models.Model):
         return self.profile.nickname
 
     def save(self, *args, **kwargs):
+        self.update_stats()
+        super().save(*args, **kwargs)
+
+    def update_stats(self):
         self.update_accuracy()
         self.update_analytics()
         self.update_ratio()
         self.update_coal_pref()
-        super().save(*args, **kwargs)
 
     @property
     def is_dead(self):
@@ -1173,10 +1213,8 @@ class VLife(models.Model):
         self.ce = round(self.kl * self.khr / 10, 2)
 
     def update_ratio(self):
-        ratio = (Sortie.objects.filter(player_id=self.id, vlife_id=self.id)
-                 .aggregate(ratio=Avg('ratio'))['ratio'])
-        if ratio:
-            self.ratio = round(ratio, 2)
+        if self.ratio_count:
+            self.ratio = round(self.ratio_sum / self.ratio_count, 2)
 
     def update_coal_pref(self):
         if self.sorties_total:
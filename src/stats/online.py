@@ -1,14 +1,12 @@
 from copy import deepcopy
-import logging
 
-from mission_report import parse_mission_log_line
+from django.conf import settings
+
 from mission_report.constants import COUNTRIES_COALITION_DEFAULT, COALITION_ALIAS
+from mission_report.stream import iter_events
 from stats.models import PlayerOnline, Profile
 
 
-logger = logging.getLogger('online')
-
-
 _countries = deepcopy(COUNTRIES_COALITION_DEFAULT)
 
 
@@ -16,35 +14,22 @@ def update_online(m_report_files, online_timestamp):
     for file_path in m_report_files:
         if file_path.stat().st_mtime > online_timestamp:
             online_timestamp = file_path.stat().st_mtime
-            with file_path.open() as f:
-                for line in f:
-                    # игнорируем "плохие" строки без
-                    if 'AType' not in line:
-                        logger.warning('ignored bad string: [{}]'.format(line))
-                        continue
+            for event in iter_events(files=[file_path], atypes=(0, 10, 21), parser=settings.MISSION_REPORT_PARSER):
+                if event.atype_id == 10:
                     try:
-                        data = parse_mission_log_line.parse(line)
-                    except parse_mission_log_line.UnexpectedATypeWarning:
-                        logger.warning('unexpected atype: [{}]'.format(line))
-                        continue
-
-                    atype_id = data.pop('atype_id')
-
-                    if atype_id == 10:
-                        try:
-                            profile = Profile.objects.get(uuid=data['account_id'])
-                        except Profile.DoesNotExist:
-                            profile = None
-                        PlayerOnline.objects.update_or_create(uuid=data['account_id'], defaults={
-                            'nickname': data['name'],
-                            'coalition': _countries[data['country_id']],
-                            'profile': profile,
-                        })
-                    elif atype_id == 21:
-                        PlayerOnline.objects.filter(uuid=data['account_id']).delete()
-                    elif atype_id == 0:
-                        for country, coalition in data['countries'].items():
-                            _countries[country] = COALITION_ALIAS[coalition]
+                        profile = Profile.objects.get(uuid=event.account_id)
+                    except Profile.DoesNotExist:
+                        profile = None
+                    PlayerOnline.objects.update_or_create(uuid=event.account_id, defaults={
+                        'nickname': event.name,
+                        'coalition': _countries[event.country_id],
+                        'profile': profile,
+                    })
+                elif event.atype_id == 21:
+                    PlayerOnline.objects.filter(uuid=event.account_id).delete()
+                elif event.atype_id == 0:
+                    for country, coalition in event.countries.items():
+                        _countries[country] = COALITION_ALIAS[coalition]
 
     return online_timestamp
 
@@ -5,9 +5,8 @@ import time
 
 from django.conf import settings
 from django.utils import timezone
-from mission_report import parse_mission_log_line
+from mission_report.stream import iter_events
 from stats.models import Profile, ProfileStats
-from stats.logger import logger
 
 USER_CONNECTED = 1
 USER_DISCONNECTED = 2
@@ -67,24 +66,13 @@ def update_profile_stats(m_report_files, prev_connected):
     file_path = m_report_files[-1]
 
     if time.time() - file_path.stat().st_mtime < 120:
-        for line in file_path.open():
-            if 'AType' not in line:
-                logger.warning('ignored bad string: [{}]'.format(line))
-                continue
-            try:
-                data = parse_mission_log_line.parse(line)
-            except parse_mission_log_line.UnexpectedATypeWarning:
-                logger.warning('unexpected atype: [{}]'.format(line))
-                continue
-
-            atype_id = data.pop('atype_id')
-
-            if atype_id == 20 and data['tik'] != 0:
-                profile_id = get_profile_id(data['account_id'])
+        for event in iter_events(files=[file_path], atypes=(20, 21), parser=settings.MISSION_REPORT_PARSER):
+            if event.atype_id == 20 and event.tik != 0:
+                profile_id = get_profile_id(event.account_id)
                 if profile_id:
                     new_logged_connects.append(profile_id)
-            elif atype_id == 21:
-                profile_id = get_profile_id(data['account_id'])
+            elif event.atype_id == 21:
+                profile_id = get_profile_id(event.account_id)
                 if profile_id:
                     new_logged_disconnects.append(profile_id)
 
@@ -92,7 +92,127 @@ def get_position_by_field(player, field):
             return 0
 
 
+def get_positions_by_field(tour, field, player_type):
+    """ позиции всех игроков тура одним запросом, как в get_position_by_field
+
+    :rtype: dict[int, int]
+    """
+    params = {'field': field, 'type': player_type, 'tour_id': tour.id, 'active': ''}
+    if INACTIVE_PLAYER_DAYS:
+        date = (tour.date_end if tour.is_ended else timezone.now()) - INACTIVE_PLAYER_DAYS
+        params['active'] = "players.date_last_combat > '{date}' AND".format(date=date)
+    with connection.cursor() as cursor:
+        sql = '''
+            SELECT
+                players.id,
+                ROW_NUMBER() OVER (ORDER BY players.{field} DESC, players.rating DESC) AS position
+            FROM players, profiles
+            WHERE
+                players.profile_id = profiles.id AND
+                players.type = '{type}' AND
+                players.tour_id = {tour_id} AND
+                {active}
+                profiles.is_hide = FALSE
+        '''
+        cursor.execute(sql.format(**params))
+        return dict(cursor.fetchall())
+
+
 def get_nicknames(profile_id):
     with connection.cursor() as cursor:
         cursor.execute('SELECT nickname FROM sorties WHERE profile_id = %s GROUP BY nickname', (profile_id,))
         return [name[0] for name in cursor.fetchall()]
+
+
+def counters_snapshot(objects, counters):
+    """ значения счетчиков объектов при загрузке из базы - для записи приращений в upsert_objects
+
+    :type objects: list[django.db.models.Model]
+    :type counters: tuple[str]
+    :rtype: dict[django.db.models.Model, dict[str, int | float]]
+    """
+    return {obj: {name: getattr(obj, name) for name in counters} for obj in objects}
+
+
+def upsert_objects(objects, counters=(), snapshot=None):
+    """ запись объектов одной модели: новые объекты (без id) добавляются через bulk_create и получают id,
+    существующие обновляются одним запросом INSERT ... ON CONFLICT (id) DO UPDATE, save() модели не вызывается
+
+    для полей counters существующих объектов пишется только приращение относительно snapshot
+    (SET col = col + приращение) - изменения сделанные в базе после загрузки объектов не затираются,
+    остальные поля записываются как есть
+
+    :type objects: list[django.db.models.Model]
+    :type counters: tuple[str]
+    :type snapshot: dict[django.db.models.Model, dict[str, int | float]] | None
+    """
+    if not objects:
+        return
+    model = type(objects[0])
+    new_objects = [obj for obj in objects if obj.pk is None]
+    objects = [obj for obj in objects if obj.pk is not None]
+    if new_objects:
+        model.objects.bulk_create(new_objects)
+    if not objects:
+        return
+    opts = model._meta
+    pk = opts.pk
+    fields = [field for field in opts.concrete_fields if field is not pk]
+    qn = connection.ops.quote_name
+    table = qn(opts.db_table)
+    params = []
+    for obj in objects:
+        params.append(obj.pk)
+        for field in fields:
+            value = field.pre_save(obj, False)
+            if field.name in counters:
+                value -= snapshot[obj][field.name]
+            params.append(field.get_db_prep_save(value, connection=connection))
+    updates = []
+    for field in fields:
+        column = qn(field.column)
+        if field.name in counters:
+            updates.append('{0} = {table}.{0} + EXCLUDED.{0}'.format(column, table=table))
+        else:
+            updates.append('{0} = EXCLUDED.{0}'.format(column))
+    sql = '''
+        INSERT INTO {table} ({pk}, {columns})
+        VALUES {rows}
+        ON CONFLICT ({pk}) DO UPDATE SET {updates}
+    '''.format(table=table, pk=qn(pk.column), columns=', '.join(qn(field.column) for field in fields),
+               rows=', '.join(['({})'.format(', '.join(['%s'] * (len(fields) + 1)))] * len(objects)),
+               updates=', '.join(updates))
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+# таблицы статистики с накопленным рейтингом и поля по которым к ним относятся вылеты
+RATIO_TABLES = (
+    ('players', (('id', 'player_id'),)),
+    ('players_missions', (('player_id', 'player_id'), ('mission_id', 'mission_id'))),
+    ('players_aircraft', (('player_id', 'player_id'), ('aircraft_id', 'aircraft_id'))),
+    ('vlifes', (('id', 'vlife_id'),)),
+)
+
+
+def get_ratio_backfill_sql():
+    """ пересчет ratio_sum, ratio_count и ratio по существующим вылетам - миграция 0034 и команда stats_ratio
+
+    :rtype: list[(str, str)]
+    """
+    queries = []
+    for table, keys in RATIO_TABLES:
+        sql = '''
+            UPDATE {table} SET ratio_sum = s.ratio_sum, ratio_count = s.ratio_count,
+                ratio = ROUND((s.ratio_sum / s.ratio_count)::NUMERIC, 2)
+            FROM (
+                SELECT {columns}, SUM(ratio) AS ratio_sum, COUNT(*) AS ratio_count
+                FROM sorties
+                GROUP BY {columns}
+            ) AS s
+            WHERE {conditions}
+        '''.format(table=table, columns=', '.join(column for _, column in keys),
+                   conditions=' AND '.join('{table}.{key} = s.{column}'.format(table=table, key=key, column=column)
+                                           for key, column in keys))
+        queries.append((table, sql))
+    return queries
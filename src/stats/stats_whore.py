@@ -1,12 +1,13 @@
 import random
 from collections import defaultdict
 from datetime import datetime, timedelta
+from itertools import chain
 import operator
 from pathlib import Path
 from pprint import pprint
 import sys
 from types import MappingProxyType
-from zipfile import ZipFile, ZIP_LZMA
+from uuid import UUID
 
 import django
 from django.conf import settings
@@ -16,13 +17,15 @@ import pytz
 import time
 
 from core import __version__
+from mission_report.log_entries import FRIENDLY_FIRE, KILLED, RTB, LogEntries
 from mission_report.statuses import LifeStatus
 from mission_report.report import MissionReport
 from stats.logger import logger
 from stats.models import (Object, Mission, Sortie, Profile, Player, PlayerAircraft, VLife,
-                          PlayerMission, KillboardPvP, Tour, LogEntry, Score, Squad)
+                          PlayerMission, KillboardPvP, Tour, LogEntry, Score, Squad, calculate_ranks)
 from stats.online import update_online, cleanup_online
 from stats.rewards import reward_sortie, reward_tour, reward_mission, reward_vlife
+from stats.sql import counters_snapshot, upsert_objects
 from users.utils import cleanup_registration
 
 from stats.current_mission import cleanup_current_mission, update_current_mission
@@ -35,6 +38,11 @@ MISSION_REPORT_BACKUP_PATH = settings.MISSION_REPORT_BACKUP_PATH
 MISSION_REPORT_BACKUP_DAYS = settings.MISSION_REPORT_BACKUP_DAYS
 MISSION_REPORT_DELETE = settings.MISSION_REPORT_DELETE
 MISSION_REPORT_PATH = settings.MISSION_REPORT_PATH
+MISSION_REPORT_PARSER = settings.MISSION_REPORT_PARSER
+MISSION_REPORT_WORKERS = settings.MISSION_REPORT_WORKERS
+MISSION_REPORT_CACHE = settings.MISSION_REPORT_CACHE
+MISSION_REPORT_INCREMENTAL = settings.MISSION_REPORT_INCREMENTAL
+LOG_ENTRIES_BATCH_SIZE = settings.LOG_ENTRIES_BATCH_SIZE
 NEW_TOUR_BY_MONTH = settings.NEW_TOUR_BY_MONTH
 TIME_ZONE = pytz.timezone(settings.MISSION_REPORT_TZ)
 
@@ -43,6 +51,11 @@ WIN_SCORE_MIN = settings.WIN_SCORE_MIN
 WIN_SCORE_RATIO = settings.WIN_SCORE_RATIO
 SORTIE_MIN_TIME = settings.SORTIE_MIN_TIME
 
+# счетчики статистики игроков по самолетам и жизней - в базу пишется их приращение за миссию
+AGGREGATE_COUNTERS = ('score', 'ratio_sum', 'ratio_count', 'sorties_total', 'flight_time', 'bailout', 'wounded',
+                      'dead', 'captured', 'relive', 'takeoff', 'landed', 'ditched', 'crashed', 'in_flight',
+                      'shotdown', 'respawn', 'disco', 'ak_total', 'ak_assist', 'gk_total', 'fak_total', 'fgk_total')
+
 
 def main():
     logger.info('IL2 stats {stats}, Python {python}, Django {django}'.format(
@@ -55,6 +68,8 @@ def main():
     online_timestamp = 0
     server_failure_timestamp = 0
     connected = []
+    # отчеты текущих миссий, обновляемые по мере появления файлов лога
+    live_reports = {}
 
     while True:
         new_reports = []
@@ -66,7 +81,7 @@ def main():
             waiting_new_report = False
             # обрабатываем все логи кроме последней миссии
             for m_report_file in new_reports[:-1]:
-                stats_whore(m_report_file=m_report_file)
+                stats_whore(m_report_file=m_report_file, m_report=live_reports.pop(m_report_file.name, None))
                 cleanup(m_report_file=m_report_file)
                 processed_reports.append(m_report_file.name)
                 connected = []
@@ -82,12 +97,16 @@ def main():
             # если последний файл был создан более 2х минут назад - обрабатываем его
             if time.time() - m_report_files[-1].stat().st_mtime > 120:
                 waiting_new_report = False
-                stats_whore(m_report_file=m_report_file)
+                stats_whore(m_report_file=m_report_file, m_report=live_reports.pop(m_report_file.name, None))
                 cleanup(m_report_file=m_report_file)
                 processed_reports.append(m_report_file.name)
                 connected = []
                 server_failure_timestamp = 0
                 continue
+            if MISSION_REPORT_INCREMENTAL:
+                live_reports[m_report_file.name] = update_live_report(
+                    m_report_file=m_report_file, m_report_files=m_report_files,
+                    m_report=live_reports.get(m_report_file.name))
 
         if not waiting_new_report:
             logger.info('waiting new report...')
@@ -102,16 +121,69 @@ def main():
             server_failure_timestamp = check_server(server_failure_timestamp)
 
 
-def backup_log(name, lines, date):
-    path_dir = MISSION_REPORT_BACKUP_PATH.joinpath(str(date.year), str(date.month), str(date.day))
-    if not path_dir.exists():
-        path_dir.mkdir(parents=True)
-    file_path = path_dir.joinpath(name)
-    with file_path.open('w') as f:
-        f.writelines(lines)
-    with ZipFile('%s.zip' % str(file_path), 'w', compression=ZIP_LZMA) as f:
-        f.write(str(file_path), arcname=name)
-    file_path.unlink()
+def get_mission_timestamp(m_report_file):
+    return int(time.mktime(time.strptime(m_report_file.name[14:-8], '%Y-%m-%d_%H-%M-%S')))
+
+
+def get_real_date(mission_timestamp):
+    real_date = TIME_ZONE.localize(datetime.fromtimestamp(mission_timestamp))
+    return real_date.astimezone(pytz.UTC)
+
+
+def get_backup_path(name, date):
+    return MISSION_REPORT_BACKUP_PATH.joinpath(str(date.year), str(date.month), str(date.day), name)
+
+
+def get_archive_path(name, date):
+    """ архив лога миссии (xz), строки пишутся в него во время обработки """
+    return get_backup_path(name=name, date=date).with_name('%s.xz' % name)
+
+
+def get_cache_path(name, date):
+    """ кэш разобранных событий миссии рядом с архивом лога """
+    return get_backup_path(name=name, date=date).with_name('%s.events' % name)
+
+
+def get_checkpoint_path(m_report_file):
+    """ сохраненное состояние отчета текущей миссии рядом с архивом лога """
+    date = get_real_date(mission_timestamp=get_mission_timestamp(m_report_file=m_report_file))
+    return get_backup_path(name=m_report_file.name, date=date).with_name('%s.checkpoint' % m_report_file.name)
+
+
+def get_objects():
+    return MappingProxyType({obj['log_name']: obj for obj in Object.objects.values()})
+
+
+def create_report(m_report_file, objects):
+    """
+    :type m_report_file: Path
+    :rtype: MissionReport
+    """
+    date = get_real_date(mission_timestamp=get_mission_timestamp(m_report_file=m_report_file))
+    return MissionReport(objects=objects, parser=MISSION_REPORT_PARSER, workers=MISSION_REPORT_WORKERS,
+                         backup_path=get_archive_path(name=m_report_file.name, date=date))
+
+
+def update_live_report(m_report_file, m_report_files, m_report=None):
+    """ обработка новых файлов лога текущей миссии
+    последний файл может еще дописываться сервером, поэтому он обрабатывается только после окончания миссии
+
+    :type m_report_file: Path
+    :type m_report_files: list[Path]
+    :type m_report: MissionReport | None
+    :rtype: MissionReport
+    """
+    checkpoint_path = get_checkpoint_path(m_report_file=m_report_file)
+    if m_report is None:
+        objects = get_objects()
+        m_report = MissionReport.load_checkpoint(path=checkpoint_path, objects=objects)
+        if m_report:
+            logger.info('{mission} - resumed from checkpoint'.format(mission=m_report_file.stem))
+        else:
+            m_report = create_report(m_report_file=m_report_file, objects=objects)
+    if m_report.feed(files=m_report_files[:-1]):
+        m_report.save_checkpoint(path=checkpoint_path)
+    return m_report
 
 
 def collect_mission_reports(m_report_file):
@@ -124,13 +196,19 @@ def cleanup(m_report_file=None):
     cleanup_online()
     cleanup_current_mission()
 
+    if m_report_file:
+        checkpoint_path = get_checkpoint_path(m_report_file=m_report_file)
+        if checkpoint_path.exists():
+            checkpoint_path.unlink()
+
     if m_report_file and MISSION_REPORT_DELETE:
         m_report_files = collect_mission_reports(m_report_file=m_report_file)
         # удаляем файлы репорты данной миссии
         for f in m_report_files:
             f.unlink()
 
-    for f in MISSION_REPORT_BACKUP_PATH.glob('**/*.zip'):
+    for f in chain(MISSION_REPORT_BACKUP_PATH.glob('**/*.zip'), MISSION_REPORT_BACKUP_PATH.glob('**/*.xz'),
+                   MISSION_REPORT_BACKUP_PATH.glob('**/*.events'), MISSION_REPORT_BACKUP_PATH.glob('**/*.checkpoint')):
         date_creation = datetime.fromtimestamp(f.stat().st_ctime)
         date_cleanup = datetime.now() - timedelta(days=MISSION_REPORT_BACKUP_DAYS)
         if date_creation < date_cleanup:
@@ -152,11 +230,13 @@ def cleanup(m_report_file=None):
 
 
 @transaction.atomic
-def stats_whore(m_report_file):
+def stats_whore(m_report_file, m_report=None):
     """
     :type m_report_file: Path
+    :param m_report: отчет обновлявшийся во время миссии (update_live_report)
+    :type m_report: MissionReport | None
     """
-    mission_timestamp = int(time.mktime(time.strptime(m_report_file.name[14:-8], '%Y-%m-%d_%H-%M-%S')))
+    mission_timestamp = get_mission_timestamp(m_report_file=m_report_file)
 
     if Mission.objects.filter(timestamp=mission_timestamp).exists():
         logger.info('{mission} - exists in the DB'.format(mission=m_report_file.stem))
@@ -165,17 +245,30 @@ def stats_whore(m_report_file):
 
     m_report_files = collect_mission_reports(m_report_file=m_report_file)
 
-    real_date = TIME_ZONE.localize(datetime.fromtimestamp(mission_timestamp))
-    real_date = real_date.astimezone(pytz.UTC)
+    real_date = get_real_date(mission_timestamp=mission_timestamp)
 
-    objects = MappingProxyType({obj['log_name']: obj for obj in Object.objects.values()})
+    objects = get_objects()
     # classes = MappingProxyType({obj['cls']: obj['cls_base'] for obj in objects.values()})
     score_dict = MappingProxyType({s.key: s.get_value() for s in Score.objects.all()})
 
-    m_report = MissionReport(objects=objects)
-    m_report.processing(files=m_report_files)
-
-    backup_log(name=m_report_file.name, lines=m_report.lines, date=real_date)
+    if m_report is None and MISSION_REPORT_INCREMENTAL:
+        m_report = MissionReport.load_checkpoint(path=get_checkpoint_path(m_report_file=m_report_file),
+                                                 objects=objects)
+    if m_report:
+        # обрабатываем только файлы появившиеся после последнего обновления отчета
+        m_report.feed(files=m_report_files)
+        m_report.log_stats()
+    elif MISSION_REPORT_CACHE:
+        m_report = create_report(m_report_file=m_report_file, objects=objects)
+        cache_path = get_cache_path(name=m_report_file.name, date=real_date)
+        # повторная обработка миссии - события из кэша без разбора лога
+        if m_report.replay(cache_path=cache_path):
+            logger.info('{mission} - events replayed from cache'.format(mission=m_report_file.stem))
+        else:
+            m_report.processing(files=m_report_files, cache_path=cache_path)
+    else:
+        m_report = create_report(m_report_file=m_report_file, objects=objects)
+        m_report.processing(files=m_report_files)
 
     if not m_report.is_correctly_completed:
         logger.info('{mission} - mission has not been completed correctly'.format(mission=m_report_file.stem))
@@ -231,7 +324,7 @@ def stats_whore(m_report_file):
         else:
             continue
 
-        squad = squads[profile.squad_id] if profile.squad else None
+        squad = squads[profile.squad_id] if profile.squad_id else None
         player.squad = squad
 
         new_sortie = create_new_sortie(mission=mission, sortie=sortie, profile=profile, player=player,
@@ -258,21 +351,37 @@ def stats_whore(m_report_file):
             mission.win_reason = 'score'
             mission.save()
 
-    for new_sortie in new_sorties:
-        _player_id = new_sortie.player.id
-        _profile_id = new_sortie.profile.id
+    # статистика игроков по самолетам и текущие жизни загружаются одним запросом, новые создаются в памяти,
+    # после обработки вылетов они записываются в базу пакетно - новые и существующие отдельно (upsert_objects)
+    players_ids = {new_sortie.player_id for new_sortie in new_sorties}
+    loaded_aircraft = {(a.player_id, a.aircraft_id): a for a in PlayerAircraft.objects.filter(
+        player_id__in=players_ids, aircraft_id__in={new_sortie.aircraft_id for new_sortie in new_sorties})}
+    vlifes = list(VLife.objects.filter(player_id__in=players_ids, tour_id=tour.id, relive=0))
+    players_vlife = {vlife.player_id: vlife for vlife in vlifes}
+    # значения счетчиков при загрузке - изменения сделанные в базе во время обработки миссии не затираются
+    snapshot = counters_snapshot(list(loaded_aircraft.values()) + vlifes, counters=AGGREGATE_COUNTERS)
+    sorties_vlife = []
 
-        player_mission = players_mission.setdefault(
-            _player_id,
-            PlayerMission.objects.get_or_create(profile_id=_profile_id, player_id=_player_id, mission_id=mission.id)[0]
-        )
-
-        player_aircraft = players_aircraft[_player_id].setdefault(
-            new_sortie.aircraft.id,
-            PlayerAircraft.objects.get_or_create(profile_id=_profile_id, player_id=_player_id, aircraft_id=new_sortie.aircraft.id)[0]
-        )
-
-        vlife = VLife.objects.get_or_create(profile_id=_profile_id, player_id=_player_id, tour_id=tour.id, relive=0)[0]
+    for new_sortie in new_sorties:
+        _player_id = new_sortie.player_id
+        _profile_id = new_sortie.profile_id
+
+        player_mission = players_mission.get(_player_id)
+        if not player_mission:
+            player_mission = players_mission[_player_id] = PlayerMission(
+                profile_id=_profile_id, player=new_sortie.player, mission_id=mission.id)
+
+        player_aircraft = players_aircraft[_player_id].get(new_sortie.aircraft_id)
+        if not player_aircraft:
+            player_aircraft = loaded_aircraft.get((_player_id, new_sortie.aircraft_id)) or PlayerAircraft(
+                profile_id=_profile_id, player=new_sortie.player, aircraft_id=new_sortie.aircraft_id)
+            players_aircraft[_player_id][new_sortie.aircraft_id] = player_aircraft
+
+        vlife = players_vlife.get(_player_id)
+        if not vlife:
+            vlife = players_vlife[_player_id] = VLife(
+                profile_id=_profile_id, player=new_sortie.player, tour_id=tour.id, relive=0)
+            vlifes.append(vlife)
 
         # если случилась победа по очкам - требуется обновить бонусы
         if mission.win_reason == 'score':
@@ -281,9 +390,18 @@ def stats_whore(m_report_file):
         update_sortie(new_sortie=new_sortie, player_mission=player_mission, player_aircraft=player_aircraft, vlife=vlife)
         reward_sortie(sortie=new_sortie)
 
-        vlife.save()
-        reward_vlife(vlife)
+        # жизнь закончилась - следующий вылет игрока начинает новую
+        if vlife.relive:
+            del players_vlife[_player_id]
+        sorties_vlife.append((new_sortie, vlife))
 
+    for vlife in vlifes:
+        vlife.update_stats()
+    upsert_objects(vlifes, counters=AGGREGATE_COUNTERS, snapshot=snapshot)
+    # награды после записи - у новых объектов уже есть id
+    for vlife in vlifes:
+        reward_vlife(vlife)
+    for new_sortie, vlife in sorties_vlife:
         new_sortie.vlife_id = vlife.id
         new_sortie.save()
 
@@ -297,9 +415,18 @@ def stats_whore(m_report_file):
         p.save()
 
     for p in players_pilots.values():
-        p.update_coal_pref()
-        p.rank = p.calculate_rank()
         p.save()
+
+    # звания считаются после сохранения рейтингов всех пилотов миссии и записываются одним запросом на звание
+    players_ranks = calculate_ranks(tour=tour, players=players_pilots.values())
+    ranks_players = defaultdict(list)
+    for p in players_pilots.values():
+        p.rank = players_ranks[p.id]
+        ranks_players[p.rank.id].append(p.id)
+    for rank_id, players_ids in ranks_players.items():
+        Player.objects.filter(id__in=players_ids).update(rank_id=rank_id)
+
+    for p in players_pilots.values():
         reward_tour(player=p)
 
     for p in players_gunners.values():
@@ -308,12 +435,15 @@ def stats_whore(m_report_file):
     for p in players_tankmans.values():
         p.save()
 
-    for aircrafts in players_aircraft.values():
-        for a in aircrafts.values():
-            a.save()
+    aircraft_stats = [a for aircrafts in players_aircraft.values() for a in aircrafts.values()]
+    for a in aircraft_stats:
+        a.update_stats()
+    upsert_objects(aircraft_stats, counters=AGGREGATE_COUNTERS, snapshot=snapshot)
 
     for p in players_mission.values():
-        p.save()
+        p.update_stats()
+    upsert_objects(list(players_mission.values()))
+    for p in players_mission.values():
         reward_mission(player_mission=p)
 
     for s in squads.values():
@@ -321,82 +451,92 @@ def stats_whore(m_report_file):
 
     tour.save()
 
-    for event in m_report.log_entries:
+    # записи событий пишутся в базу пачками
+    log_entries = []
+    for event_type, tik, actor, target, damage, flags, pos in m_report.log_entries:
         params = {
             'mission_id': mission.id,
-            'date': real_date + timedelta(seconds=event['tik'] // 50),
-            'tik': event['tik'],
+            'date': real_date + timedelta(seconds=tik // 50),
+            'tik': tik,
             'extra_data': {
-                'pos': event.get('pos'),
+                'pos': pos,
             },
         }
-        if event['type'] == 'respawn':
+        if event_type == 'respawn':
             params['type'] = 'respawn'
-            params['act_object_id'] = event['sortie'].sortie_db.aircraft.id
-            params['act_sortie_id'] = event['sortie'].sortie_db.id
-        elif event['type'] == 'end':
+            params['act_object_id'] = actor.sortie_db.aircraft_id
+            params['act_sortie_id'] = actor.sortie_db.id
+        elif event_type == 'end':
             params['type'] = 'end'
-            params['act_object_id'] = event['sortie'].sortie_db.aircraft.id
-            params['act_sortie_id'] = event['sortie'].sortie_db.id
-        elif event['type'] == 'takeoff':
+            params['act_object_id'] = actor.sortie_db.aircraft_id
+            params['act_sortie_id'] = actor.sortie_db.id
+        elif event_type == 'takeoff':
             params['type'] = 'takeoff'
-            params['act_object_id'] = event['aircraft'].sortie.sortie_db.aircraft.id
-            params['act_sortie_id'] = event['aircraft'].sortie.sortie_db.id
-        elif event['type'] == 'landed':
-            params['act_object_id'] = event['aircraft'].sortie.sortie_db.aircraft.id
-            params['act_sortie_id'] = event['aircraft'].sortie.sortie_db.id
-            if event['is_rtb'] and not event['is_killed']:
+            params['act_object_id'] = actor.sortie.sortie_db.aircraft_id
+            params['act_sortie_id'] = actor.sortie.sortie_db.id
+        elif event_type == 'landed':
+            params['act_object_id'] = actor.sortie.sortie_db.aircraft_id
+            params['act_sortie_id'] = actor.sortie.sortie_db.id
+            if flags & RTB and not flags & KILLED:
                 params['type'] = 'landed'
             else:
-                if event['status'] == LifeStatus.destroyed:
+                if LogEntries.get_status(flags) == LifeStatus.destroyed:
                     params['type'] = 'crashed'
                 else:
                     params['type'] = 'ditched'
-        elif event['type'] == 'bailout':
+        elif event_type == 'bailout':
             params['type'] = 'bailout'
-            params['act_object_id'] = event['bot'].sortie.sortie_db.aircraft.id
-            params['act_sortie_id'] = event['bot'].sortie.sortie_db.id
-        elif event['type'] == 'damage':
-            params['extra_data']['damage'] = event['damage']
-            params['extra_data']['is_friendly_fire'] = event['is_friendly_fire']
-            if event['target'].cls_base == 'crew':
+            params['act_object_id'] = actor.sortie.sortie_db.aircraft_id
+            params['act_sortie_id'] = actor.sortie.sortie_db.id
+        elif event_type == 'damage':
+            params['extra_data']['damage'] = damage
+            params['extra_data']['is_friendly_fire'] = bool(flags & FRIENDLY_FIRE)
+            if target.cls_base == 'crew':
                 params['type'] = 'wounded'
             else:
                 params['type'] = 'damaged'
-            if event['attacker']:
-                if event['attacker'].sortie:
-                    params['act_object_id'] = event['attacker'].sortie.sortie_db.aircraft.id
-                    params['act_sortie_id'] = event['attacker'].sortie.sortie_db.id
+            if actor:
+                if actor.sortie:
+                    params['act_object_id'] = actor.sortie.sortie_db.aircraft_id
+                    params['act_sortie_id'] = actor.sortie.sortie_db.id
                 else:
-                    params['act_object_id'] = objects[event['attacker'].log_name]['id']
-            if event['target'].sortie:
-                params['cact_object_id'] = event['target'].sortie.sortie_db.aircraft.id
-                params['cact_sortie_id'] = event['target'].sortie.sortie_db.id
+                    params['act_object_id'] = objects[actor.log_name]['id']
+            if target.sortie:
+                params['cact_object_id'] = target.sortie.sortie_db.aircraft_id
+                params['cact_sortie_id'] = target.sortie.sortie_db.id
             else:
-                params['cact_object_id'] = objects[event['target'].log_name]['id']
-        elif event['type'] == 'kill':
-            params['extra_data']['is_friendly_fire'] = event['is_friendly_fire']
-            if event['target'].cls_base == 'crew':
+                params['cact_object_id'] = objects[target.log_name]['id']
+        elif event_type == 'kill':
+            params['extra_data']['is_friendly_fire'] = bool(flags & FRIENDLY_FIRE)
+            if target.cls_base == 'crew':
                 params['type'] = 'killed'
-            elif event['target'].cls_base == 'aircraft':
+            elif target.cls_base == 'aircraft':
                 params['type'] = 'shotdown'
             else:
                 params['type'] = 'destroyed'
-            if event['attacker']:
-                if event['attacker'].sortie:
-                    params['act_object_id'] = event['attacker'].sortie.sortie_db.aircraft.id
-                    params['act_sortie_id'] = event['attacker'].sortie.sortie_db.id
+            if actor:
+                if actor.sortie:
+                    params['act_object_id'] = actor.sortie.sortie_db.aircraft_id
+                    params['act_sortie_id'] = actor.sortie.sortie_db.id
                 else:
-                    params['act_object_id'] = objects[event['attacker'].log_name]['id']
-            if event['target'].sortie:
-                params['cact_object_id'] = event['target'].sortie.sortie_db.aircraft.id
-                params['cact_sortie_id'] = event['target'].sortie.sortie_db.id
+                    params['act_object_id'] = objects[actor.log_name]['id']
+            if target.sortie:
+                params['cact_object_id'] = target.sortie.sortie_db.aircraft_id
+                params['cact_sortie_id'] = target.sortie.sortie_db.id
             else:
-                params['cact_object_id'] = objects[event['target'].log_name]['id']
+                params['cact_object_id'] = objects[target.log_name]['id']
 
-        l = LogEntry.objects.create(**params)
-        if l.type == 'shotdown' and l.act_sortie and l.cact_sortie and not l.act_sortie.is_disco and not l.extra_data.get('is_friendly_fire'):
-            update_killboard_pvp(player=l.act_sortie.player, opponent=l.cact_sortie.player, players_killboard=players_killboard)
+        log_entries.append(LogEntry(**params))
+        if len(log_entries) >= LOG_ENTRIES_BATCH_SIZE:
+            LogEntry.objects.bulk_create(log_entries)
+            log_entries = []
+        # вылеты события берутся из памяти, без загрузки записи и вылетов из базы
+        if (params['type'] == 'shotdown' and 'act_sortie_id' in params and 'cact_sortie_id' in params
+                and not actor.sortie.sortie_db.is_disco and not flags & FRIENDLY_FIRE):
+            update_killboard_pvp(player=actor.sortie.sortie_db.player, opponent=target.sortie.sortie_db.player,
+                                 players_killboard=players_killboard)
+
+    LogEntry.objects.bulk_create(log_entries)
 
     for p in players_killboard.values():
         p.save()
@@ -428,37 +568,76 @@ def get_tour(date):
     return tour
 
 
+def get_player_type(sortie):
+    """
+    :type sortie: mission_report.report.Sortie
+    :rtype: str | None
+    """
+    if sortie.cls_base == 'aircraft':
+        return 'pilot'
+    elif sortie.cls == 'aircraft_turret':
+        return 'gunner'
+    elif sortie.cls in ('tank_light', 'tank_heavy', 'tank_medium', 'tank_turret'):
+        return 'tankman'
+
+
 def create_profiles(tour, sorties):
+    """ профили, игроки и сквады участников миссии - существующие загружаются одним запросом на таблицу,
+    недостающие создаются через bulk_create (без save - все они сохраняются после обработки миссии)
+    """
+    # последний ник участника
+    nicknames = {}
+    for s in sorties:
+        nicknames[s.account_id] = s.nickname
+
+    profiles_uuid = {p.uuid: p for p in Profile.objects.filter(uuid__in=list(nicknames))}
     profiles = {}
+    new_profiles = []
+    for account_id, nickname in nicknames.items():
+        uuid = UUID(account_id)
+        profile = profiles_uuid.get(uuid)
+        if profile is None:
+            profile = profiles_uuid[uuid] = Profile(uuid=uuid, nickname=nickname)
+            new_profiles.append(profile)
+        profile.nickname = nickname
+        profiles[account_id] = profile
+    Profile.objects.bulk_create(new_profiles)
+
+    players = {(p.profile_id, p.type): p for p in Player.objects.filter(
+        tour_id=tour.id, profile_id__in=[p.id for p in profiles.values()])}
     players_pilots = {}
     players_gunners = {}
     players_tankmans = {}
+    players_by_type = {'pilot': players_pilots, 'gunner': players_gunners, 'tankman': players_tankmans}
+    new_players = []
     for s in sorties:
-        profile = profiles.setdefault(
-            s.account_id, Profile.objects.get_or_create(uuid=s.account_id, defaults={'nickname': s.nickname})[0])
-        profile.nickname = s.nickname
-        if s.cls_base == 'aircraft':
-            players_pilots.setdefault(
-                s.account_id, Player.objects.get_or_create(profile_id=profile.id, tour_id=tour.id, type='pilot')[0])
-        elif s.cls == 'aircraft_turret':
-            players_gunners.setdefault(
-                s.account_id, Player.objects.get_or_create(profile_id=profile.id, tour_id=tour.id, type='gunner')[0])
-        elif s.cls in ('tank_light', 'tank_heavy', 'tank_medium', 'tank_turret'):
-            players_tankmans.setdefault(
-                s.account_id, Player.objects.get_or_create(profile_id=profile.id, tour_id=tour.id, type='tankman')[0])
-
-    squads = {}
+        player_type = get_player_type(sortie=s)
+        if player_type is None or s.account_id in players_by_type[player_type]:
+            continue
+        profile_id = profiles[s.account_id].id
+        player = players.get((profile_id, player_type))
+        if player is None:
+            player = players[(profile_id, player_type)] = Player(profile_id=profile_id, tour_id=tour.id,
+                                                                 type=player_type)
+            new_players.append(player)
+        players_by_type[player_type][s.account_id] = player
+    Player.objects.bulk_create(new_players)
+
+    # если профиль не привязан к юзеру, пробуем найти и привязать
+    users_nicknames = {p.nickname for p in profiles.values() if not p.user_id}
+    users = {u.username: u for u in User.objects.filter(username__in=users_nicknames, is_active=True)
+             .select_related('profile')}
     for p in profiles.values():
-        # если профиль не привязан к юзеру, пробуем найти и привязать
-        if not p.user:
-            try:
-                user = User.objects.get(username=p.nickname, is_active=True)
-                if not hasattr(user, 'profile'):
-                    p.connect_with_user(user=user)
-            except User.DoesNotExist:
-                pass
-        if p.squad:
-            squads.setdefault(p.squad_id, Squad.objects.get_or_create(profile_id=p.squad_id, tour_id=tour.id)[0])
+        if not p.user_id:
+            user = users.get(p.nickname)
+            if user and not hasattr(user, 'profile'):
+                p.connect_with_user(user=user)
+
+    squads_ids = {p.squad_id for p in profiles.values() if p.squad_id}
+    squads = {s.profile_id: s for s in Squad.objects.filter(tour_id=tour.id, profile_id__in=squads_ids)}
+    new_squads = [Squad(profile_id=squad_id, tour_id=tour.id) for squad_id in squads_ids if squad_id not in squads]
+    Squad.objects.bulk_create(new_squads)
+    squads.update((s.profile_id, s) for s in new_squads)
 
     return profiles, players_pilots, players_gunners, players_tankmans, squads
 
@@ -600,6 +779,11 @@ def update_sortie(new_sortie, player_mission, player_aircraft, vlife):
         vlife.date_last_combat = new_sortie.date_start
     vlife.date_last_sortie = new_sortie.date_start
 
+    # средний ratio считается по всем вылетам, включая диско и игнорируемые
+    for stats in (player, player_mission, player_aircraft, vlife):
+        stats.ratio_sum += new_sortie.ratio
+        stats.ratio_count += 1
+
     # если вылет был окончен диско - результаты вылета не добавляться к общему профилю
     if new_sortie.is_disco:
         player.disco += 1
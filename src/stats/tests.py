@@ -1,3 +1,101 @@
-from django.test import TestCase
+import uuid
 
-# Create your tests here.
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase
+
+from stats.models import Player, Profile, Rank, Tour, VLife, select_generals
+from stats.sql import counters_snapshot, upsert_objects
+
+
+def sorties_cls(heavy=0, medium=0, light=0, **other):
+    cls = {'aircraft_heavy': heavy, 'aircraft_medium': medium, 'aircraft_light': light}
+    cls.update(other)
+    return cls
+
+
+class SelectGeneralsTest(SimpleTestCase):
+    def test_coalitions_and_types(self):
+        generals = select_generals([
+            (1, 1, 100, sorties_cls(heavy=5, medium=1)),
+            (2, 1, 200, sorties_cls(light=3)),
+            (3, 2, 50, sorties_cls(heavy=5)),
+            (4, 1, 150, sorties_cls(heavy=7, light=2)),
+        ])
+        self.assertEqual(generals, {(1, 'aircraft_heavy'): 4, (1, 'aircraft_light'): 2, (2, 'aircraft_heavy'): 3})
+
+    def test_equal_sorties(self):
+        # вылетов на типах поровну - игрок подходит для обоих типов, как при сравнении >= в прежнем SQL
+        generals = select_generals([
+            (1, 1, 100, sorties_cls(heavy=2, medium=2)),
+            (2, 1, 50, sorties_cls(medium=4)),
+        ])
+        self.assertEqual(generals, {(1, 'aircraft_heavy'): 1, (1, 'aircraft_medium'): 1})
+
+    def test_equal_rating(self):
+        generals = select_generals([
+            (1, 1, 100, sorties_cls(light=3)),
+            (2, 1, 100, sorties_cls(light=5)),
+        ])
+        self.assertEqual(generals, {(1, 'aircraft_light'): 1})
+
+    def test_missing_aircraft_type(self):
+        # нет ключа в sorties_cls - в прежнем SQL сравнение с NULL, игрок не подходит ни для одного типа
+        generals = select_generals([
+            (1, 1, 1000, {'aircraft_heavy': 9, 'aircraft_medium': 0}),
+            (2, 1, 10, sorties_cls(heavy=1)),
+        ])
+        self.assertEqual(generals, {(1, 'aircraft_heavy'): 2})
+
+    def test_other_aircraft_classes(self):
+        # транспорт и стрелки при выборе типа не учитываются
+        generals = select_generals([
+            (1, 2, 100, sorties_cls(medium=1, aircraft_transport=20, aircraft_turret=30)),
+        ])
+        self.assertEqual(generals, {(2, 'aircraft_medium'): 1})
+
+
+class UpsertObjectsTest(TestCase):
+    def setUp(self):
+        Rank.objects.get_or_create(id=0, defaults={'allied_rank': '', 'axis_rank': '', 'min_flight_hours': 0,
+                                                   'min_rating': 0, 'min_rating_position': 0})
+        self.tour = Tour.objects.create()
+        profile = Profile.objects.create(uuid=uuid.uuid4(), nickname='pilot')
+        self.player = Player.objects.create(tour=self.tour, profile=profile)
+
+    def create_vlifes(self, count):
+        VLife.objects.bulk_create([VLife(profile_id=self.player.profile_id, player=self.player, tour=self.tour)
+                                   for _ in range(count)])
+        return list(VLife.objects.filter(player=self.player))
+
+    def test_query_count(self):
+        # жизни игроков миссии со 100 вылетами: прежде save() на каждый объект, теперь один запрос на таблицу
+        vlifes = self.create_vlifes(100)
+        for vlife in vlifes:
+            vlife.score += 10
+        with self.assertNumQueries(100):
+            for vlife in vlifes:
+                vlife.save()
+        for vlife in vlifes:
+            vlife.score += 10
+        with self.assertNumQueries(1):
+            upsert_objects(vlifes)
+        new_vlifes = [VLife(profile_id=self.player.profile_id, player=self.player, tour=self.tour) for _ in range(10)]
+        with self.assertNumQueries(2):
+            upsert_objects(vlifes + new_vlifes)
+        self.assertTrue(all(vlife.id for vlife in new_vlifes))
+        self.assertEqual(set(VLife.objects.filter(player=self.player).values_list('score', flat=True)), {0, 20})
+
+    def test_counters_delta(self):
+        vlife, = self.create_vlifes(1)
+        snapshot = counters_snapshot([vlife], counters=('score', 'ratio_sum'))
+        # изменение в базе после загрузки объекта (stats_ratio, админка)
+        VLife.objects.filter(id=vlife.id).update(score=F('score') + 5, ratio_sum=F('ratio_sum') + 1, sorties_total=7)
+        vlife.score += 10
+        vlife.ratio_sum += 2
+        vlife.sorties_total += 1
+        upsert_objects([vlife], counters=('score', 'ratio_sum'), snapshot=snapshot)
+        vlife.refresh_from_db()
+        self.assertEqual(vlife.score, 15)
+        self.assertEqual(vlife.ratio_sum, 3)
+        # поле не из counters записывается как есть
+        self.assertEqual(vlife.sorties_total, 1)